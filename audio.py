@@ -0,0 +1,192 @@
+import os
+import subprocess
+import threading
+import time
+import wave
+from array import array
+from ringbuffer import RingBuffer
+
+# Band analysis needs NumPy; without it the audio effects just see silence
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+WINDOW = 1024        # FFT size in samples
+HOP = 256            # new samples per analysis, ~5.8 ms at 44.1 kHz
+MIN_FREQ = 40
+MAX_FREQ = 16000
+NOISE_FLOOR = 0.005  # band amplitude (full scale = 1.0) treated as silence
+PEAK_MIN = 0.05      # the automatic gain never boosts a band by more than 1 / PEAK_MIN
+PEAK_DECAY = 0.999   # per analysis; how quickly the automatic gain recovers after loud passages
+RELEASE = 0.95       # per analysis; how quickly a band level falls back after a hit
+IDLE_TIMEOUT = 5.0   # stop capturing once no effect has read levels for this long
+RETRY_TIME = 5.0     # wait before reopening an input that failed
+
+
+class AudioInput:
+    # Captures audio on its own thread and publishes band levels (0.0 - 1.0,
+    # lowest band first) through a RingBuffer. "input" is "alsa" to record
+    # with arecord from alsa_device, a .wav file, or a file or named pipe of
+    # raw mono S16_LE samples at "rate". Files are played in real time and loop.
+    def __init__(self, config):
+        self.input = config.get('input', 'alsa')
+        self.alsa_device = config.get('alsa_device', 'default')
+        self.rate = config.get('rate', 44100)
+        self.bands = config.get('bands', 8)
+
+        self.ring = RingBuffer(8, self.bands)
+        self.levels_out = array('f', [0.0]) * self.bands
+        self.stamp = None  # time.monotonic() of the analysis in levels_out
+
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.last_read = 0.0
+        self.retry_at = 0.0
+        self.lock = threading.Lock()
+
+    def levels(self):
+        # Newest band levels, starting capture if it isn't running. Returns the
+        # same array on every call.
+        self.last_read = time.monotonic()
+        if np is not None and (self.thread is None or not self.thread.is_alive()):
+            self.start()
+        self.stamp = self.ring.latest(self.levels_out)
+        return self.levels_out
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            if time.monotonic() < self.retry_at or self.stop_event.is_set():
+                return
+            self.thread = threading.Thread(target=self.worker, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+
+    def open(self):
+        # Returns (read(count) -> bytes of mono S16_LE samples, sample rate, paced, close)
+        if self.input == 'alsa':
+            process = subprocess.Popen(
+                ["arecord", "-q", "-D", self.alsa_device, "-t", "raw", "-f", "S16_LE", "-c", "1",
+                 "-r", str(self.rate), "--buffer-time=20000", "--period-time=5000"],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+            def close():
+                process.terminate()
+                process.wait()
+            return lambda count: process.stdout.read(count * 2), self.rate, False, close
+
+        if self.input.endswith('.wav'):
+            wav = wave.open(self.input, 'rb')
+            if wav.getsampwidth() != 2:
+                wav.close()
+                raise ValueError(f"{self.input} is not 16-bit")
+            channels = wav.getnchannels()
+
+            def read(count):
+                data = wav.readframes(count)
+                if len(data) < count * 2 * channels:
+                    wav.rewind()
+                    data = wav.readframes(count)
+                if channels == 1:
+                    return data
+                mixed = np.frombuffer(data, dtype='<i2').reshape(-1, channels).mean(axis=1)
+                return mixed.astype('<i2').tobytes()
+            return read, wav.getframerate(), True, wav.close
+
+        f = open(self.input, 'rb')
+        paced = os.path.isfile(self.input)
+
+        def read(count):
+            data = f.read(count * 2)
+            if paced and len(data) < count * 2:
+                f.seek(0)
+                data = f.read(count * 2)
+            return data
+        return read, self.rate, paced, f.close
+
+    def worker(self):
+        try:
+            read, rate, paced, close = self.open()
+        except Exception as e:
+            print(f"Error opening audio input {self.input}: {e}")
+            self.retry_at = time.monotonic() + RETRY_TIME
+            return
+        print(f"Audio capture started from {self.input}")
+
+        window = np.hanning(WINDOW).astype(np.float32)
+        scale = 2 / window.sum()  # FFT magnitude -> sine amplitude
+        freqs = np.fft.rfftfreq(WINDOW, 1 / rate)
+        edges = np.searchsorted(freqs, np.geomspace(MIN_FREQ, min(MAX_FREQ, rate / 2), self.bands + 1))
+        # At least one FFT bin per band
+        edges = np.maximum(edges, edges[0] + np.arange(self.bands + 1))[:-1]
+
+        samples = np.zeros(WINDOW, dtype=np.float32)
+        peak = np.full(self.bands, PEAK_MIN - NOISE_FLOOR, dtype=np.float32)
+        levels = np.zeros(self.bands, dtype=np.float32)
+        next_time = time.monotonic()
+
+        try:
+            while not self.stop_event.is_set() and time.monotonic() - self.last_read < IDLE_TIMEOUT:
+                data = read(HOP)
+                if len(data) < HOP * 2:
+                    print(f"Audio input {self.input} ended")
+                    self.retry_at = time.monotonic() + RETRY_TIME
+                    break
+
+                # Slide the window along by one hop and analyse it straight away,
+                # so the newest levels are never more than a hop behind the input
+                samples[:-HOP] = samples[HOP:]
+                samples[-HOP:] = np.frombuffer(data, dtype='<i2') / 32768.0
+                spectrum = np.abs(np.fft.rfft(samples * window)) * scale
+                amplitude = np.maximum.reduceat(spectrum, edges)
+
+                # Anything under the noise floor is silence, and the level is
+                # measured from the floor up, so hiss just above it stays low.
+                # The gain recovers after loud passages, but only down to
+                # PEAK_MIN, so quiet noise is never scaled up to a full level.
+                np.subtract(amplitude, NOISE_FLOOR, out=amplitude)
+                np.maximum(amplitude, 0, out=amplitude)
+                np.maximum(np.maximum(amplitude, peak * PEAK_DECAY), PEAK_MIN - NOISE_FLOOR, out=peak)
+                np.maximum(amplitude / peak, levels * RELEASE, out=levels)
+                self.ring.push(levels, time.monotonic())
+
+                if paced:
+                    next_time += HOP / rate
+                    delay = next_time - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        next_time = time.monotonic()
+        finally:
+            close()
+            print(f"Audio capture stopped from {self.input}")
+
+
+_config = {}
+_input = None
+
+
+def configure(config):
+    # Settings for the shared input, from device.audio in config.json
+    global _config
+    _config = config
+
+
+def levels():
+    # Newest band levels for effects; capture starts on first use and stops
+    # again once nothing has asked for a while
+    global _input
+    if _input is None:
+        _input = AudioInput(_config)
+    return _input.levels()
+
+
+def stop():
+    if _input is not None:
+        _input.stop()
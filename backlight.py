@@ -0,0 +1,95 @@
+import glob
+import os
+import subprocess
+import time
+
+FADE_STEP = 1 / 60  # seconds between brightness writes during a fade
+
+
+def ease(progress):
+    # Smoothstep: starts and ends gently rather than jumping between rates
+    return progress * progress * (3 - 2 * progress)
+
+
+class Backlight:
+    # Writes /sys/class/backlight/<device>/brightness through a file opened
+    # once. Needs write access to the attribute (a udev rule or group
+    # permission); without it a single `sudo tee` helper is started and kept
+    # open, and each value is written down its stdin.
+    def __init__(self, device=None):
+        if device is None:
+            devices = sorted(glob.glob('/sys/class/backlight/*'))
+            if not devices:
+                raise FileNotFoundError("No backlight device in /sys/class/backlight")
+            device = devices[0]
+        self.device = device
+        self.path = os.path.join(device, "brightness")
+        # What the hardware is actually set to; the backlight core notifies
+        # pollers of this attribute whenever the brightness changes
+        self.actual_path = os.path.join(device, "actual_brightness")
+        with open(os.path.join(device, "max_brightness"), "r") as f:
+            self.max_brightness = int(f.read().strip())
+
+        self.fd = None
+        self.helper = None
+        self.value = None  # last value written
+
+    def open(self):
+        if self.fd is not None or self.helper is not None:
+            return
+        try:
+            self.fd = os.open(self.path, os.O_WRONLY)
+        except PermissionError:
+            print(f"No write access to {self.path}, using a sudo tee helper")
+            self.helper = subprocess.Popen(["sudo", "tee", self.path], stdin=subprocess.PIPE,
+                                           stdout=subprocess.DEVNULL)
+
+    def read(self):
+        with open(self.path, "r") as f:
+            return int(f.read().strip())
+
+    def write(self, value):
+        value = max(0, min(self.max_brightness, int(value)))
+        if value == self.value:
+            return
+        self.open()
+        data = f"{value}\n".encode()
+        if self.fd is not None:
+            os.pwrite(self.fd, data, 0)
+        else:
+            try:
+                self.helper.stdin.write(data)
+                self.helper.stdin.flush()
+            except (BrokenPipeError, ValueError):
+                # The helper went away; start a new one for the next write
+                self.helper = None
+                raise
+        self.value = value
+
+    def fade(self, start, target, duration, stop_event=None):
+        # Eased fade from start to target over duration seconds, writing only
+        # when the value actually changes. Returns early (with the value it got
+        # to) if stop_event is set.
+        began = time.monotonic()
+        self.value = None  # something else may have changed it since our last write
+        value = start
+        while True:
+            progress = min(1.0, (time.monotonic() - began) / duration) if duration > 0 else 1.0
+            value = round(start + (target - start) * ease(progress))
+            self.write(value)
+            if progress >= 1.0:
+                return value
+            if stop_event is not None:
+                if stop_event.wait(FADE_STEP):
+                    return value
+            else:
+                time.sleep(FADE_STEP)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        if self.helper is not None:
+            self.helper.stdin.close()
+            self.helper.wait()
+            self.helper = None
@@ -0,0 +1,159 @@
+import argparse
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from framebuffer import StripOutput
+from simulator import SimulatedStrip
+from effects.manager import EffectManager
+from effects.registry import EffectRegistry
+from effects.renderer import Renderer
+from effects import render
+
+# Benchmarks every registered effect on a simulated strip. Run from the repo root:
+#   python benchmark.py --output bench.json --compare last_release.json
+
+PIXEL_COUNTS = [13, 60, 300, 1000]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def timed(func, samples):
+    def wrapper(*args):
+        start = time.perf_counter()
+        result = func(*args)
+        samples.append(time.perf_counter() - start)
+        return result
+    return wrapper
+
+
+def start_effect(effect_manager, effect_name, duration):
+    if effect_name == "fade":
+        effect_manager.fade([255, 128, 0], duration)
+    else:
+        effect_manager.start(effect_name, [255, 128, 0], 200)
+
+
+def bench_effect(effect_name, pixels, fps, duration, alloc_frames):
+    renderer = Renderer(fps)
+    # Not paced like the real DMA transfer, so show times are just the cost of
+    # handing the frame over; the transfer itself is reported separately
+    strip = SimulatedStrip(pixels, max_frames=1, realtime=False)
+    output = StripOutput(strip)
+    effect_manager = EffectManager(renderer, pixels)
+    renderer.add_segment(renderer.add_channel(output), 0, effect_manager)
+
+    render_times = []
+    show_times = []
+    effect_manager.render = timed(effect_manager.render, render_times)
+    output.show = timed(output.show, show_times)
+
+    # Timing pass on the real render thread
+    start = time.monotonic()
+    start_effect(effect_manager, effect_name, duration)
+    time.sleep(duration)
+    renderer.stop()
+    elapsed = time.monotonic() - start
+    frames = renderer.scheduler.frames
+
+    # Allocation pass, rendering frames directly with tracemalloc running. The
+    # effect is started again (the fade, for one, has finished by now) without
+    # a crossfade, and drawn once before tracing starts.
+    del effect_manager.render, output.show  # the timing wrappers allocate too
+    effect_manager.crossfade = 0
+    start_effect(effect_manager, effect_name, duration + (alloc_frames + 1) / fps)
+    now = time.monotonic()
+    renderer.render_frame(now)
+    allocated = []
+    tracemalloc.start()
+    for i in range(1, alloc_frames + 1):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        renderer.render_frame(now + i / fps)
+        allocated.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+
+    return {
+        "effect": effect_name,
+        "pixels": pixels,
+        "fps": round(frames / elapsed, 2),
+        "frames": frames,
+        "dropped": renderer.scheduler.dropped,
+        "render_ms_p50": round(percentile(render_times, 50) * 1000, 4),
+        "render_ms_p99": round(percentile(render_times, 99) * 1000, 4),
+        "show_ms_p50": round(percentile(show_times, 50) * 1000, 4),
+        "show_ms_p99": round(percentile(show_times, 99) * 1000, 4),
+        "transfer_ms": round(strip.transfer_time * 1000, 4),
+        "sent": output.sent,
+        "skipped": output.skipped,
+        "alloc_bytes_per_frame": int(statistics.mean(allocated)) if allocated else 0,
+    }
+
+
+def compare(results, previous_path, threshold):
+    with open(previous_path, "r") as f:
+        previous = {(r["effect"], r["pixels"]): r for r in json.load(f)["results"]}
+
+    regressions = 0
+    for result in results:
+        old = previous.get((result["effect"], result["pixels"]))
+        if not old or not old["render_ms_p99"]:
+            continue
+        ratio = result["render_ms_p99"] / old["render_ms_p99"]
+        if ratio > threshold:
+            regressions += 1
+            print(f"REGRESSION {result['effect']} @ {result['pixels']} px: "
+                  f"p99 render {old['render_ms_p99']}ms -> {result['render_ms_p99']}ms ({ratio:.2f}x)")
+    print(f"{regressions} regression(s) against {previous_path}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HomeSlate LED effects on a simulated strip")
+    parser.add_argument("--fps", type=int, default=60, help="target frame rate")
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds to run each effect")
+    parser.add_argument("--pixels", type=int, nargs="+", default=PIXEL_COUNTS, help="pixel counts to test")
+    parser.add_argument("--effects", nargs="+", help="effects to test (default: all registered, plus fade)")
+    parser.add_argument("--alloc-frames", type=int, default=50, help="frames to trace for allocations")
+    parser.add_argument("--output", default="bench_results.json", help="where to write the JSON results")
+    parser.add_argument("--compare", help="previous results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.2, help="p99 render slowdown counted as a regression")
+    args = parser.parse_args()
+
+    effect_names = args.effects or EffectRegistry().names(include_hidden=True) + ["fade"]
+
+    results = []
+    print(f"{'effect':<12} {'pixels':>6} {'fps':>7} {'drop':>5} {'render p50/p99 ms':>18} "
+          f"{'show p50/p99 ms':>16} {'alloc B/frame':>13}")
+    for effect_name in effect_names:
+        for pixels in args.pixels:
+            result = bench_effect(effect_name, pixels, args.fps, args.duration, args.alloc_frames)
+            results.append(result)
+            print(f"{effect_name:<12} {pixels:>6} {result['fps']:>7} {result['dropped']:>5} "
+                  f"{result['render_ms_p50']:>8}/{result['render_ms_p99']:<9} "
+                  f"{result['show_ms_p50']:>7}/{result['show_ms_p99']:<8} {result['alloc_bytes_per_frame']:>13}")
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "numpy": render.HAVE_NUMPY,
+        "target_fps": args.fps,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
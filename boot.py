@@ -4,7 +4,9 @@ import threading
 import pygame
 import json
 import os
-from rpi_ws281x import PixelStrip, Color
+from framebuffer import FrameBuffer, StripOutput
+from led_strips import strip_configs, create_strips
+from effects import render
 
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), "config.json")
 
@@ -12,9 +14,6 @@ def read_config():
     with open(CONFIG_PATH, "r") as f:
         return json.load(f)
 
-def interpolate(c1, c2, t):
-    return [int(c1[i] + (c2[i] - c1[i]) * t) for i in range(3)]
-
 def get_rgb():
     return (255, 105, 180)
 
@@ -60,42 +59,21 @@ def show_loading_overlay(duration=5):
 
 def run_boot_effect():
     config = read_config()
-    led_conf = config['device']
-
-    strip = PixelStrip(
-        led_conf['led_pixel_count'],
-        led_conf['led_control_pin'],
-        800000,
-        10,
-        False,
-        255,
-        0
-    )
-    strip.begin()
-
-    threading.Thread(target=show_loading_overlay, daemon=True).start()
-
-    length = strip.numPixels()
-    brightness = get_brightness() / 255
 
+    # Play the animation on every configured strip at once
     colors = [
         (255, 105, 180),
         (138, 43, 226),
         (0, 255, 255),
     ]
+    strips = []
+    for strip in create_strips(strip_configs(config['device'])):
+        length = strip.numPixels()
+        strips.append((strip, length, FrameBuffer(length), StripOutput(strip), render.gradient(colors, length)))
 
-    gradient = []
-    segments = len(colors) - 1
-    steps_per_segment = length // segments
-
-    for i in range(segments):
-        for j in range(steps_per_segment):
-            t = j / steps_per_segment
-            gradient.append(interpolate(colors[i], colors[i + 1], t))
+    threading.Thread(target=show_loading_overlay, daemon=True).start()
 
-    while len(gradient) < length:
-        gradient.append(colors[-1])
-    gradient = gradient[:length]
+    brightness = get_brightness() / 255
 
     build_time = 1.5
     pulse_duration = 2.0
@@ -103,72 +81,48 @@ def run_boot_effect():
     fade_time = 1.0
     update_delay = 0.02
 
-    for i in range(length):
-        strip.setPixelColor(i, Color(0, 0, 0))
-    strip.show()
+    for strip, length, frame, output, gradient in strips:
+        frame.clear()
+        output.show(frame)
 
-    for step in range((length // 2) + 1):
-        for i in range(length):
-            if i >= (length // 2) - step and i <= (length // 2) + step:
-                r, g, b = gradient[i]
-                r, g, b = [int(c * brightness) for c in (r, g, b)]
-                strip.setPixelColor(i, Color(r, g, b))
-        strip.show()
-        time.sleep(build_time / (length // 2 + 1))
+    build_steps = max(length // 2 + 1 for _, length, _, _, _ in strips)
+    for step in range(build_steps):
+        for strip, length, frame, output, gradient in strips:
+            mid = length // 2
+            reach = step * (mid + 1) // build_steps
+            render.draw(frame, gradient, brightness, start=mid - reach, stop=mid + reach + 1)
+            output.show(frame)
+        time.sleep(build_time / build_steps)
 
     wave_start = time.time()
     while time.time() - wave_start < pulse_duration:
         progress = time.time() - wave_start
-        for i in range(length):
-            wave = math.sin(2 * math.pi * (progress * wave_cycles - i / length))
-            scale = (wave + 1) / 2
-            r, g, b = gradient[i]
-            r, g, b = [int(c * scale * brightness) for c in (r, g, b)]
-            strip.setPixelColor(i, Color(r, g, b))
-        strip.show()
+        for strip, length, frame, output, gradient in strips:
+            render.draw(frame, gradient, render.wave(length, progress * wave_cycles, peak=brightness))
+            output.show(frame)
         time.sleep(update_delay)
 
     shimmer_start = time.time()
     shimmer_duration = 1.0
     while time.time() - shimmer_start < shimmer_duration:
-        offset = int((time.time() - shimmer_start) * 20) % length
-        for i in range(length):
-            base_idx = (i + offset) % length
-            r, g, b = gradient[base_idx]
-            r, g, b = [int(c * brightness) for c in (r, g, b)]
-            strip.setPixelColor(i, Color(r, g, b))
-        strip.show()
+        for strip, length, frame, output, gradient in strips:
+            offset = int((time.time() - shimmer_start) * 20) % length
+            render.draw(frame, gradient, brightness, shift=offset)
+            output.show(frame)
         time.sleep(update_delay)
 
     for fade_step in range(20, -1, -1):
         scale = fade_step / 20
-        for i in range(length):
-            r, g, b = gradient[i]
-            r, g, b = [int(c * scale * brightness) for c in (r, g, b)]
-            strip.setPixelColor(i, Color(r, g, b))
-        strip.show()
+        for strip, length, frame, output, gradient in strips:
+            render.draw(frame, gradient, scale * brightness)
+            output.show(frame)
         time.sleep(fade_time / 20)
 
-    for i in range(length):
-        strip.setPixelColor(i, Color(0, 0, 0))
-    strip.show()
-
-    strip._cleanup()
+    for strip, length, frame, output, gradient in strips:
+        frame.clear()
+        output.show(frame)
+        strip._cleanup()
     time.sleep(0.5)
 
 if __name__ == "__main__":
-    config = read_config()
-    led_conf = config['device']
-
-    strip = PixelStrip(
-        led_conf['led_pixel_count'],
-        led_conf['led_control_pin'],
-        800000,
-        10,
-        False,
-        255,
-        0
-    )
-    strip.begin()
     run_boot_effect()
-    
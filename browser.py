@@ -4,9 +4,11 @@ import subprocess
 import time
 
 class BrowserManager:
-    def __init__(self, config, mqtt_client):
+    def __init__(self, config, mqtt_client, runtime=None):
         self.config = config
         self.mqtt_client = mqtt_client
+        # Browser actions go to the runtime so MQTT callbacks return at once
+        self.runtime = runtime
         self.device_name = self.config['device']['name']
         self.device_id = self.config['device']['id']
 
@@ -20,6 +22,8 @@ class BrowserManager:
             {"name": "Exit Browser", "topic": f"button/{self.device_name.lower().replace(' ', '_')}/exit", "action": self.close_browser}
         ]
 
+        self.discovery = self.build_discovery()
+
     def launch_browser(self):
         """Launch Chromium in kiosk mode."""
         try:
@@ -44,6 +48,20 @@ class BrowserManager:
         print("Refreshing Chromium browser...")
         self.launch_browser()
 
+    def supervise(self):
+        """Relaunch Chromium if it exited without being closed."""
+        if self.browser_process and self.browser_process.poll() is not None:
+            print(f"Chromium exited with code {self.browser_process.returncode}, relaunching...")
+            self.browser_process = None
+            self.launch_browser()
+
+    def run(self, action):
+        """Run a browser action, one at a time in the runtime's browser lane."""
+        if self.runtime:
+            self.runtime.submit(action, lane="browser")
+        else:
+            action()
+
     def close_browser(self):
         """Close Chromium browser."""
         if self.browser_process:
@@ -51,8 +69,9 @@ class BrowserManager:
             self.browser_process.terminate()
             self.browser_process = None
 
-    def setup_discovery(self):
-        """Announce browser control elements to MQTT."""
+    def build_discovery(self):
+        """[(discovery topic, JSON payload)] for the browser control elements."""
+        discovery = []
         for control_item in self.control_items:
             discovery_topic = f"{self.config['mqtt']['base_topic']}/{control_item['topic']}/config"
             discovery_payload = {
@@ -66,8 +85,14 @@ class BrowserManager:
                     "manufacturer": "Aled Evans"
                 }
             }
-            self.mqtt_client.publish(discovery_topic, json.dumps(discovery_payload))
-            print(f"Published discovery for {control_item['name']}")
+            discovery.append((discovery_topic, json.dumps(discovery_payload)))
+        return discovery
+
+    def setup_discovery(self):
+        """Announce browser control elements to MQTT."""
+        for discovery_topic, discovery_payload in self.discovery:
+            self.mqtt_client.publish(discovery_topic, discovery_payload, force=True)
+        print(f"Published discovery for {', '.join(item['name'] for item in self.control_items)}")
 
     def setup_browser_control(self):
         """Subscribe to MQTT topics for browser control."""
@@ -76,5 +101,5 @@ class BrowserManager:
             self.mqtt_client.subscribe(topic)
             self.mqtt_client.message_callback_add(
                 topic,
-                lambda client, userdata, msg, action=control_item["action"]: action()
+                lambda client, userdata, msg, action=control_item["action"]: self.run(action)
             )
@@ -0,0 +1,54 @@
+import glob
+import os
+from sysfs_watch import SysfsWatcher
+
+
+def find_connector(display_name):
+    # /sys/class/drm/card<N>-<display_name>, e.g. card1-DSI-2
+    matches = sorted(glob.glob(f"/sys/class/drm/card*-{display_name}"))
+    return matches[0] if matches else None
+
+
+class FakeDisplaySource:
+    # Event source for testing without a display: push() delivers
+    # [enabled, dpms] the way the sysfs watcher would
+    def __init__(self):
+        self.on_change = None
+
+    def start(self, on_change):
+        self.on_change = on_change
+
+    def push(self, enabled, dpms):
+        self.on_change([enabled, dpms])
+
+    def stop(self):
+        pass
+
+
+class DisplayMonitor:
+    # Cached on/off state of the display, kept up to date from the DRM
+    # connector's "enabled" and "dpms" attributes rather than by running
+    # wlr-randr. on_change(state) is only called when the state flips.
+    def __init__(self, display_name, on_change, interval=10.0, source=None):
+        self.on_change = on_change
+        self.state = None
+
+        if source is None:
+            connector = find_connector(display_name)
+            if connector is None:
+                raise FileNotFoundError(f"No DRM connector for {display_name}")
+            source = SysfsWatcher([os.path.join(connector, "enabled"), os.path.join(connector, "dpms")], interval)
+        self.source = source
+
+    def start(self):
+        self.source.start(self.update)
+
+    def update(self, values):
+        enabled, dpms = values
+        state = enabled == "enabled" and dpms == "On"
+        if state != self.state:
+            self.state = state
+            self.on_change(state)
+
+    def stop(self):
+        self.source.stop()
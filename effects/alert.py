@@ -1,24 +1,10 @@
-import time
-from rpi_ws281x import Color
+from effects import render
 
-def run(strip, get_rgb, get_brightness, stop_event):
-    off = Color(0, 0, 0)
+PERIOD = 0.6  # 0.3s on, 0.3s off
+FPS = 10
 
-    while not stop_event.is_set():
-        rgb = get_rgb()
-        brightness = get_brightness()
-        r, g, b = [int(c * (brightness / 255)) for c in rgb]
-        color = Color(r, g, b)
-
-        for i in range(strip.numPixels()):
-            strip.setPixelColor(i, color)
-        strip.show()
-        time.sleep(0.3)
-
-        if stop_event.is_set():
-            break
-
-        for i in range(strip.numPixels()):
-            strip.setPixelColor(i, off)
-        strip.show()
-        time.sleep(0.3)
+def render_frame(t, frame, rgb, brightness):
+    if t % PERIOD < PERIOD / 2:
+        frame.fill(render.scale(rgb, brightness / 255))
+    else:
+        frame.clear()
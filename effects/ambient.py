@@ -0,0 +1,6 @@
+import screen_capture
+from effects import render
+
+def render_frame(t, frame, rgb, brightness):
+    # Bias lighting: the strip follows the colours at the edges of the screen
+    render.draw(frame, screen_capture.colors(len(frame)), brightness / 255)
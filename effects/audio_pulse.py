@@ -0,0 +1,10 @@
+import audio
+from effects import render
+
+BASS_BANDS = 2  # lowest bands that drive the pulse
+
+def render_frame(t, frame, rgb, brightness):
+    # Whole strip in the light's colour, brightness following the bass
+    levels = audio.levels()
+    bass = max(levels[:BASS_BANDS])
+    frame.fill(render.scale(rgb, bass * (brightness / 255)))
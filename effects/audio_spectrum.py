@@ -0,0 +1,18 @@
+import audio
+from effects import render
+
+COLORS = [
+    (255, 0, 0),    # Bass
+    (255, 255, 0),
+    (0, 255, 0),
+    (0, 255, 255),
+    (0, 0, 255),    # Treble
+]
+
+def render_frame(t, frame, rgb, brightness):
+    # One section of the strip per frequency band, lit by that band's level
+    length = len(frame)
+    levels = audio.levels()
+
+    gradient = render.gradient(COLORS, length)  # Cached per strip length
+    render.draw(frame, gradient, render.spread(levels, length, brightness / 255))
@@ -0,0 +1,17 @@
+import audio
+from effects import render
+
+COLORS = [
+    (0, 255, 0),    # Quiet
+    (255, 255, 0),
+    (255, 0, 0),    # Loud
+]
+
+def render_frame(t, frame, rgb, brightness):
+    # Level meter filling the strip from the start with the loudest band
+    length = len(frame)
+    levels = audio.levels()
+    lit = int(max(levels) * length + 0.5)
+
+    gradient = render.gradient(COLORS, length)  # Cached per strip length
+    render.draw(frame, gradient, brightness / 255, stop=lit)
@@ -1,23 +1,11 @@
-import time
-from rpi_ws281x import Color
+from effects import render
 
-def run(strip, get_rgb, get_brightness, stop_event):
-    on_time = 0.5
-    off_time = 0.5
+ON_TIME = 0.5
+OFF_TIME = 0.5
+FPS = 10
 
-    while not stop_event.is_set():
-        # ON
-        r, g, b = [int(c * (get_brightness() / 255)) for c in get_rgb()]
-        color = Color(r, g, b)
-        for i in range(strip.numPixels()):
-            strip.setPixelColor(i, color)
-        strip.show()
-        time.sleep(on_time)
-
-        if stop_event.is_set(): break
-
-        # OFF
-        for i in range(strip.numPixels()):
-            strip.setPixelColor(i, Color(0, 0, 0))
-        strip.show()
-        time.sleep(off_time)
+def render_frame(t, frame, rgb, brightness):
+    if t % (ON_TIME + OFF_TIME) < ON_TIME:
+        frame.fill(render.scale(rgb, brightness / 255))
+    else:
+        frame.clear()
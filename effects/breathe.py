@@ -1,35 +1,16 @@
-import time
-from rpi_ws281x import Color
+from effects import render
 
-def run(strip, get_rgb, get_brightness, stop_event):
-    steps = 50
-    delay = 0.03  # total cycle ~3s
-    hold_time = 0.6  # extra pause when dimmed
+FADE_TIME = 1.5  # each of fade in and fade out, total cycle ~3s
+HOLD_TIME = 0.6  # extra pause when dimmed
 
-    while not stop_event.is_set():
-        rgb = get_rgb()
+def render_frame(t, frame, rgb, brightness):
+    phase = t % (2 * FADE_TIME + HOLD_TIME)
 
-        # Fade in
-        for i in range(steps):
-            if stop_event.is_set(): return
-            factor = i / steps
-            r, g, b = [int(c * factor * (get_brightness() / 255)) for c in rgb]
-            color = Color(r, g, b)
-            for j in range(strip.numPixels()):
-                strip.setPixelColor(j, color)
-            strip.show()
-            time.sleep(delay)
+    if phase < FADE_TIME:
+        factor = phase / FADE_TIME  # Fade in
+    elif phase < 2 * FADE_TIME:
+        factor = 1 - (phase - FADE_TIME) / FADE_TIME  # Fade out
+    else:
+        factor = 0  # Hold dim briefly
 
-        # Fade out
-        for i in range(steps, -1, -1):
-            if stop_event.is_set(): return
-            factor = i / steps
-            r, g, b = [int(c * factor * (get_brightness() / 255)) for c in rgb]
-            color = Color(r, g, b)
-            for j in range(strip.numPixels()):
-                strip.setPixelColor(j, color)
-            strip.show()
-            time.sleep(delay)
-
-        # Hold dim briefly
-        time.sleep(hold_time)
+    frame.fill(render.scale(rgb, factor * (brightness / 255)))
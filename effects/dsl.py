@@ -0,0 +1,181 @@
+import json
+import re
+from types import SimpleNamespace
+from effects import render
+from framebuffer import FrameBuffer
+
+# Declarative effects, e.g.
+#
+#   {
+#       "name": "ocean",
+#       "layers": [
+#           {"palette": ["#001040", "#0080ff", "#00ffc0"], "scroll": 0.1},
+#           {"palette": "color", "waveform": "sine", "speed": 0.5, "cycles": 2,
+#            "min": 0.2, "max": 1.0, "direction": "backward", "opacity": 0.5}
+#       ]
+#   }
+#
+# Layer keys:
+#   palette    list of "#rrggbb" / [r, g, b] stops spread along the strip,
+#              "rainbow", or "color" for the light's current colour (default)
+#   waveform   "constant" (default), "sine", "triangle", "sawtooth" or "square"
+#   speed      waveform cycles per second
+#   cycles     waveform cycles along the strip; 0 pulses the whole strip together
+#   min, max   brightness range of the waveform, 0..1
+#   scroll     palette movement in strip lengths per second
+#   direction  "forward" (default) or "backward", for both waveform and scroll
+#   opacity    how much the layer covers the ones below it, 0..1 (default 1)
+#
+# Effect keys: name (letters, digits, "_" and "-" only), layers, and
+# optionally fps and duration (positive numbers; duration in seconds, for
+# effects that finish), hidden and supports_live_color (true or false; the
+# latter defaults to whether any layer uses the "color" palette).
+#
+# Specs arrive over MQTT, so anything malformed raises ValueError here rather
+# than failing later on the render thread.
+
+WAVEFORMS = ("constant",) + render.WAVE_SHAPES
+DIRECTIONS = {"forward": 1, "backward": -1}
+PALETTES = {
+    "rainbow": ((255, 0, 0), (255, 255, 0), (0, 255, 0), (0, 255, 255), (0, 0, 255), (255, 0, 255), (255, 0, 0)),
+}
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def number(layer, key, default):
+    value = layer.get(key, default)
+    if not is_number(value):
+        raise ValueError(f"Layer {key} must be a number, got {value!r}")
+    return float(value)
+
+
+def parse_color(value):
+    if isinstance(value, str):
+        value = value.lstrip("#")
+        if len(value) != 6:
+            raise ValueError(f"Invalid colour: #{value}")
+        return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+    if not isinstance(value, list) or len(value) != 3 or not all(is_number(c) for c in value):
+        raise ValueError(f"Invalid colour: {value}")
+    return tuple(min(255, max(0, int(c))) for c in value)
+
+
+def parse_layer(layer):
+    if not isinstance(layer, dict):
+        raise ValueError(f"Layers must be objects, got {layer!r}")
+    palette = layer.get("palette", "color")
+    if palette == "color":
+        palette = None
+    elif isinstance(palette, str):
+        if palette not in PALETTES:
+            raise ValueError(f"Unknown palette: {palette}")
+        palette = PALETTES[palette]
+    elif isinstance(palette, list) and palette:
+        palette = tuple(parse_color(stop) for stop in palette)
+        if len(palette) < 2:
+            # A gradient needs two stops; one colour is a solid fill
+            palette = palette * 2
+    else:
+        raise ValueError(f"Invalid palette: {palette!r}")
+
+    waveform = layer.get("waveform", "constant")
+    if waveform not in WAVEFORMS:
+        raise ValueError(f"Unknown waveform: {waveform}")
+    direction = layer.get("direction", "forward")
+    if direction not in DIRECTIONS:
+        raise ValueError(f"Unknown direction: {direction}")
+
+    return {
+        "palette": palette,
+        "waveform": waveform,
+        "speed": number(layer, "speed", 1.0) * DIRECTIONS[direction],
+        "cycles": number(layer, "cycles", 1.0),
+        "min": number(layer, "min", 0.0),
+        "max": number(layer, "max", 1.0),
+        "scroll": number(layer, "scroll", 0.0) * DIRECTIONS[direction],
+        "opacity": number(layer, "opacity", 1.0),
+    }
+
+
+# Names end up as file names in led_effects_dir and in Home Assistant's
+# effect list, and arrive over MQTT, so nothing path-like gets through
+NAME_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
+
+
+def check_spec(spec):
+    # The effect-level keys; layers are checked as they're parsed
+    if not isinstance(spec, dict):
+        raise ValueError("Effect spec must be a JSON object")
+    layers = spec.get("layers") or []
+    if not isinstance(layers, list) or not all(isinstance(layer, dict) for layer in layers):
+        raise ValueError("Effect layers must be a list of objects")
+    for key in ("fps", "duration"):
+        value = spec.get(key)
+        if value is not None and not (is_number(value) and value > 0):
+            raise ValueError(f"Effect {key} must be a positive number, got {value!r}")
+    for key in ("hidden", "supports_live_color"):
+        if not isinstance(spec.get(key, False), bool):
+            raise ValueError(f"Effect {key} must be true or false, got {spec[key]!r}")
+
+
+def metadata(spec, default_name=None):
+    # Registry metadata for a spec, without compiling it
+    check_spec(spec)
+    name = spec.get("name") or default_name
+    if not name:
+        raise ValueError("Effect has no name")
+    if not isinstance(name, str) or not NAME_PATTERN.fullmatch(name):
+        raise ValueError(f"Invalid effect name {name!r}: use letters, digits, _ and - only")
+    layers = spec.get("layers") or []
+    return {
+        "name": name,
+        "supports_live_color": spec.get("supports_live_color",
+                                        any(layer.get("palette", "color") == "color" for layer in layers)),
+        "fps": spec.get("fps"),
+        "hidden": spec.get("hidden", False),
+    }
+
+
+def compile_effect(spec):
+    # Build an effect module equivalent (render_frame and DURATION) from a spec.
+    # Everything that doesn't change per frame is worked out here, so the
+    # frame function only computes the waveform and draws each layer.
+    check_spec(spec)
+    layers = [parse_layer(layer) for layer in spec.get("layers") or []]
+    if not layers:
+        raise ValueError("Effect has no layers")
+
+    scratch = {}  # length: FrameBuffer for the layers drawn over the first
+
+    def render_frame(t, frame, rgb, brightness):
+        length = len(frame)
+        level = brightness / 255
+
+        for index, layer in enumerate(layers):
+            target = frame
+            if index:
+                target = scratch.get(length)
+                if target is None:
+                    target = scratch[length] = FrameBuffer(length)
+
+            colors = render.gradient(layer["palette"] or (tuple(rgb), tuple(rgb)), length)
+            if layer["waveform"] == "constant":
+                factor = layer["max"] * level
+            else:
+                factor = render.wave(length, t * layer["speed"], layer["cycles"], layer["max"] * level,
+                                     layer["waveform"], layer["min"] * level)
+            shift = int(t * layer["scroll"] * length) % length if layer["scroll"] else 0
+            render.draw(target, colors, factor, shift=shift)
+
+            if index:
+                render.blend(frame, frame, target, layer["opacity"])
+
+    return SimpleNamespace(render_frame=render_frame, DURATION=spec.get("duration"))
+
+
+def load_effect(path):
+    with open(path, "r") as f:
+        return compile_effect(json.load(f))
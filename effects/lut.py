@@ -0,0 +1,98 @@
+import threading
+from array import array
+from collections import OrderedDict
+from framebuffer import color
+
+# Gamma applied by brightness_table(); 1.0 keeps the plain linear scaling
+GAMMA = 1.0
+
+# Tables are cached per (kind, pixel count, palette...) and the least recently
+# used one is evicted once this many are held
+MAX_TABLES = 32
+
+_tables = OrderedDict()
+_lock = threading.Lock()
+
+
+def cached(key, build):
+    with _lock:
+        if key in _tables:
+            _tables.move_to_end(key)
+            return _tables[key]
+
+    table = build()
+
+    with _lock:
+        _tables[key] = table
+        while len(_tables) > MAX_TABLES:
+            _tables.popitem(last=False)
+    return table
+
+
+def clear():
+    with _lock:
+        _tables.clear()
+
+
+def wheel_color(pos):
+    if pos < 85:
+        return color(pos * 3, 255 - pos * 3, 0)
+    elif pos < 170:
+        pos -= 85
+        return color(255 - pos * 3, 0, pos * 3)
+    else:
+        pos -= 170
+        return color(0, pos * 3, 255 - pos * 3)
+
+
+WHEEL = array('I', [wheel_color(pos) for pos in range(256)])
+
+
+def wheel_strip(length):
+    # The wheel repeated out to length + 256 entries, so the frame for any
+    # offset is the plain slice [offset:offset + length]
+    def build():
+        repeats = (length + 256) // 256 + 1
+        return (WHEEL * repeats)[:length + 256]
+    return cached(("wheel", length), build)
+
+
+def gradient(palette, length):
+    # Even multi-stop gradient across length pixels as a list of (r, g, b)
+    palette = tuple(tuple(stop) for stop in palette)
+
+    def build():
+        segments = len(palette) - 1
+        steps_per_segment = length // segments
+        result = []
+        for i in range(segments):
+            for j in range(steps_per_segment):
+                t = j / steps_per_segment
+                result.append(tuple(int(palette[i][k] + (palette[i + 1][k] - palette[i][k]) * t) for k in range(3)))
+
+        # Pad if needed (in case rounding shortens it)
+        while len(result) < length:
+            result.append(palette[-1])
+        return result[:length]
+    return cached(("gradient", palette, length), build)
+
+
+def brightness_table(gamma=None):
+    # 256x256 bytes, row = brightness level, column = channel value
+    gamma = GAMMA if gamma is None else gamma
+
+    def build():
+        table = bytearray(256 * 256)
+        for level in range(256):
+            for value in range(256):
+                scaled = value * level / 255
+                if gamma != 1.0:
+                    scaled = 255 * (scaled / 255) ** gamma
+                table[level * 256 + value] = int(scaled)
+        return bytes(table)
+    return cached(("brightness", gamma), build)
+
+
+def level(factor):
+    # Brightness factor (0.0 - 1.0) -> row of brightness_table()
+    return min(255, max(0, int(factor * 255 + 0.5)))
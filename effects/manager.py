@@ -1,62 +1,167 @@
-from effects import rainbow, chase, alert, breathe, blink_soft, chase_soft, loading
+from effects import render
+from effects.registry import EffectRegistry
+from framebuffer import FrameBuffer, color
 import threading
 
 
 class EffectManager:
-    def __init__(self):
-        self.current_thread = None
-        self.stop_event = None
+    # Effect state for one LED segment. The shared Renderer calls render() once
+    # per frame; start(), fade() and stop() just swap what it draws, taking
+    # effect at the next frame boundary.
+    def __init__(self, renderer, length, crossfade=0.5, registry=None):
+        self.renderer = renderer
+        self.frame = FrameBuffer(length)
+        self.active = None   # render_frame(t, frame) for the running effect or fade
+        self.pending = None  # (render_frame, crossfade) picked up at the start of the next frame
+        self.started = 0.0
+
+        # Switching effects blends the outgoing and incoming effect over this many seconds
+        self.crossfade = crossfade
+        self.transition = None  # (outgoing render_frame, its start time, transition start time)
+        self.outgoing_frame = FrameBuffer(length)
+        self.incoming_frame = FrameBuffer(length)
         self.current_effect = None
+        self.lock = threading.Lock()
 
         self.rgb = [255, 255, 255]
         self.brightness = 255
 
-        # effect_name: (function, supports_live_color)
-        self.effects = {
-            "rainbow": (rainbow.run, False),
-            "chase": (chase.run, True),
-            "alert": (alert.run, True),
-            "breathe": (breathe.run, True),
-            "blink_soft": (blink_soft.run, True),
-            "chase_soft": (chase_soft.run, True),
-            "loading": (loading.run, True),
-        }
-
-    def start(self, effect_name, strip, rgb, brightness):
-        self.stop()
+        # Last colour shown by fade(), where the next fade starts from
+        self.solid_rgb = [0, 0, 0]
+
+        # Effects are imported from the registry the first time they're started
+        self.registry = registry or EffectRegistry()
+
+    def start(self, effect_name, rgb, brightness):
         self.rgb = rgb
         self.brightness = brightness
 
-        if effect_name not in self.effects:
+        if effect_name not in self.registry:
             print(f"Unknown effect: {effect_name}")
+            self.stop()
             return
 
-        self.stop_event = threading.Event()
-        effect_func, supports_live = self.effects[effect_name]
+        try:
+            metadata = self.registry.get(effect_name)
+        except Exception as e:
+            print(f"Error loading effect {effect_name}: {e}")
+            self.stop()
+            return
 
-        def get_live_rgb(): return self.rgb
-        def get_live_brightness(): return self.brightness
+        effect = metadata["module"]
+        supports_live = metadata["supports_live_color"]
+        fps = metadata["fps"]
+        # Finite effects (e.g. loading) declare how long they run for
+        duration = getattr(effect, "DURATION", None)
+        last_drawn = [None, None]  # (frame, step) last drawn when limited to fps
 
-        def runner():
-            print(f"Running effect: {effect_name}")
+        def render_frame(t, frame):
+            if fps:
+                # Effects that change slower than the render clock only redraw
+                # when they step; the frame keeps what was drawn last time
+                step = int(t * fps)
+                if last_drawn == [frame, step]:
+                    return
+                last_drawn[:] = [frame, step]
+                t = step / fps
             if supports_live:
-                effect_func(strip, get_live_rgb, get_live_brightness, self.stop_event)
+                effect.render_frame(t, frame, self.rgb, self.brightness)
             else:
-                effect_func(strip, rgb, brightness, self.stop_event)
+                effect.render_frame(t, frame, rgb, brightness)
+            if duration is not None and t >= duration:
+                return False
 
-        self.current_thread = threading.Thread(target=runner, daemon=True)
-        self.current_thread.start()
+        print(f"Running effect: {effect_name}")
         self.current_effect = effect_name
+        self.run(render_frame, crossfade=True)
+
+    def fade(self, target, duration, start=None):
+        # Fade the segment to a solid colour on the render clock, so the caller
+        # returns straight away. Without an explicit start the fade begins from
+        # the colour currently shown, which lets a new command retarget a fade
+        # that is still running. Leaving an effect crossfades out of it.
+        start = list(self.solid_rgb if start is None else start)
+        target = list(target)
+        from_effect = self.current_effect is not None
+        self.current_effect = None
+
+        def render_frame(t, frame):
+            progress = min(1.0, t / duration) if duration > 0 else 1.0
+            self.solid_rgb = [int(a + (b - a) * progress) for a, b in zip(start, target)]
+            frame.fill(color(*self.solid_rgb))
+            if progress >= 1.0:
+                return False
+
+        self.run(render_frame, crossfade=from_effect)
+
+    def run(self, render_frame, crossfade=False):
+        with self.lock:
+            self.pending = (render_frame, crossfade)
+        self.renderer.wake()
+
+    def busy(self):
+        return self.active is not None or self.pending is not None or self.transition is not None
+
+    def render(self, now):
+        # Draw the current frame into self.frame; returns whether anything was drawn
+        with self.lock:
+            if self.pending is not None:
+                render_frame, crossfade = self.pending
+                if crossfade and self.crossfade > 0:
+                    # Keep the outgoing effect running (or, if it has
+                    # finished, its last frame) to blend from
+                    self.outgoing_frame.pixels[:] = self.frame.pixels
+                    self.transition = (self.active, self.started, now)
+                else:
+                    self.transition = None
+                # The new effect's clock starts on this frame
+                self.active, self.pending = render_frame, None
+                self.started = now
+            active = self.active
+            transition = self.transition
+
+        if transition is not None:
+            outgoing, outgoing_started, transition_started = transition
+            alpha = (now - transition_started) / self.crossfade
+            if alpha < 1.0:
+                if outgoing is not None and outgoing(now - outgoing_started, self.outgoing_frame) is False:
+                    self.transition = (None, outgoing_started, transition_started)
+                if active is not None and active(now - self.started, self.incoming_frame) is False:
+                    self.finished(active)
+                render.blend(self.frame, self.outgoing_frame, self.incoming_frame, alpha)
+                return True
+            self.transition = None
+            if active is None:
+                # The incoming effect finished during the blend
+                self.frame.pixels[:] = self.incoming_frame.pixels
+                return True
+
+        if active is None:
+            return False
+        if active(now - self.started, self.frame) is False:
+            self.finished(active)
+        return True
+
+    def finished(self, render_frame):
+        with self.lock:
+            if self.active is render_frame:
+                # Finished effects and fades leave their last frame showing
+                self.active = None
 
     def update_color(self, rgb, brightness):
         self.rgb = rgb
         self.brightness = brightness
 
+    def failed(self):
+        # Drop whatever raised during render(); a start() already queued still runs
+        with self.lock:
+            self.active = None
+            self.transition = None
+        self.current_effect = None
+
     def stop(self):
-        if self.stop_event:
-            self.stop_event.set()
-        if self.current_thread:
-            self.current_thread.join(timeout=2)
-        self.current_thread = None
-        self.stop_event = None
+        with self.lock:
+            self.active = None
+            self.pending = None
+            self.transition = None
         self.current_effect = None
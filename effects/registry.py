@@ -0,0 +1,151 @@
+import ast
+import glob
+import importlib
+import importlib.metadata
+import importlib.util
+import json
+import os
+import threading
+from effects import dsl
+
+BUILTIN_DIR = os.path.dirname(os.path.abspath(__file__))
+ENTRY_POINT_GROUP = "homeslate.effects"
+
+# Module-level constants an effect may declare, read without importing it
+METADATA_FIELDS = {
+    "NAME": None,                 # defaults to the module name
+    "SUPPORTS_LIVE_COLOR": True,  # follows colour/brightness changes while running
+    "FPS": None,                  # render at most this often; None = every frame
+    "HIDDEN": False,              # left out of the Home Assistant effect list
+}
+
+
+def read_metadata(path, default_name):
+    # Parse an effect module's source for its metadata. Returns None for
+    # modules that aren't effects (no top-level render_frame).
+    try:
+        with open(path, "r") as f:
+            tree = ast.parse(f.read(), path)
+    except (OSError, SyntaxError) as e:
+        print(f"Error reading effect {path}: {e}")
+        return None
+
+    values = dict(METADATA_FIELDS)
+    is_effect = False
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name == "render_frame":
+            is_effect = True
+        elif isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            field = node.targets[0].id
+            if field in METADATA_FIELDS:
+                try:
+                    values[field] = ast.literal_eval(node.value)
+                except ValueError:
+                    print(f"Ignoring non-literal {field} in {path}")
+
+    if not is_effect:
+        return None
+
+    return {
+        "name": values["NAME"] or default_name,
+        "supports_live_color": values["SUPPORTS_LIVE_COLOR"],
+        "fps": values["FPS"],
+        "hidden": values["HIDDEN"],
+        "path": path,
+    }
+
+
+class EffectRegistry:
+    # Effects discovered from the built-in effects/ directory, an optional plugin
+    # directory and the "homeslate.effects" entry point group. Only metadata is
+    # read up front; each module is imported the first time it is started.
+    # The plugin directory may also hold declarative effects (*.json, see
+    # effects/dsl.py), and more can be defined at runtime with define().
+    def __init__(self, plugin_dir=None):
+        self.effects = {}  # name: metadata dict, plus "module" once loaded
+        self.lock = threading.Lock()
+
+        for path in sorted(glob.glob(os.path.join(BUILTIN_DIR, "*.py"))):
+            stem = os.path.splitext(os.path.basename(path))[0]
+            self.add(path, stem, f"effects.{stem}")
+
+        if plugin_dir and os.path.isdir(plugin_dir):
+            for path in sorted(glob.glob(os.path.join(plugin_dir, "*.py"))):
+                stem = os.path.splitext(os.path.basename(path))[0]
+                self.add(path, stem, None)
+            for path in sorted(glob.glob(os.path.join(plugin_dir, "*.json"))):
+                self.add_spec(path, os.path.splitext(os.path.basename(path))[0])
+
+        for entry_point in importlib.metadata.entry_points(group=ENTRY_POINT_GROUP):
+            try:
+                spec = importlib.util.find_spec(entry_point.module)
+            except (ImportError, ValueError) as e:
+                print(f"Error finding effect {entry_point.name}: {e}")
+                continue
+            if spec and spec.origin:
+                self.add(spec.origin, entry_point.name, entry_point.module)
+
+    def add(self, path, default_name, module_name):
+        metadata = read_metadata(path, default_name)
+        if metadata is None:
+            return
+        if metadata["name"] in self.effects:
+            print(f"Effect {metadata['name']} from {path} is already registered, skipping")
+            return
+        metadata["module_name"] = module_name
+        metadata["module"] = None
+        self.effects[metadata["name"]] = metadata
+
+    def add_spec(self, path, default_name):
+        try:
+            with open(path, "r") as f:
+                metadata = dsl.metadata(json.load(f), default_name)
+        except (OSError, ValueError) as e:
+            print(f"Error reading effect {path}: {e}")
+            return
+        if metadata["name"] in self.effects:
+            print(f"Effect {metadata['name']} from {path} is already registered, skipping")
+            return
+        metadata.update(path=path, module_name=None, module=None, spec=True)
+        self.effects[metadata["name"]] = metadata
+
+    def define(self, spec):
+        # Compile and register a declarative effect straight away, replacing an
+        # earlier declarative effect of the same name. Raises ValueError for an
+        # invalid spec or a name taken by a Python effect.
+        metadata = dsl.metadata(spec)
+        module = dsl.compile_effect(spec)
+        with self.lock:
+            existing = self.effects.get(metadata["name"])
+            if existing and not existing.get("spec"):
+                raise ValueError(f"Effect {metadata['name']} is a built-in or plugin effect")
+            metadata.update(path=None, module_name=None, module=module, spec=True)
+            self.effects[metadata["name"]] = metadata
+        return metadata
+
+    def names(self, include_hidden=False):
+        with self.lock:
+            return [name for name, metadata in self.effects.items() if include_hidden or not metadata["hidden"]]
+
+    def __contains__(self, name):
+        return name in self.effects
+
+    def get(self, name):
+        # Metadata for an effect, importing its module on first use
+        metadata = self.effects[name]
+        with self.lock:
+            if metadata["module"] is None:
+                metadata["module"] = self.load(metadata)
+        return metadata
+
+    def load(self, metadata):
+        if metadata.get("spec"):
+            return dsl.load_effect(metadata["path"])
+        if metadata["module_name"]:
+            return importlib.import_module(metadata["module_name"])
+
+        # Plugin directory files aren't on sys.path, so load them by location
+        spec = importlib.util.spec_from_file_location(f"homeslate_effect_{metadata['name']}", metadata["path"])
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
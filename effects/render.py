@@ -0,0 +1,160 @@
+import math
+from framebuffer import color
+from effects import lut
+
+# NumPy is optional; without it every helper falls back to plain Python loops
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAVE_NUMPY = np is not None
+
+
+def _view(frame):
+    # Zero-copy uint32 view over the frame's array('I') storage
+    return np.frombuffer(frame.pixels, dtype=np.uint32)
+
+
+def _pack(rgb):
+    # (n, 3) uint8 array -> packed 0x00RRGGBB
+    rgb = rgb.astype(np.uint32)
+    return (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+
+
+def _brightness_table():
+    return lut.cached(("brightness_np", lut.GAMMA),
+                      lambda: np.frombuffer(lut.brightness_table(), dtype=np.uint8).reshape(256, 256))
+
+
+def scale(rgb, factor):
+    # Packed colour for rgb scaled by factor (brightness / 255 * fade etc.)
+    row = lut.level(factor) * 256
+    table = lut.brightness_table()
+    r, g, b = [table[row + min(255, max(0, int(c)))] for c in rgb]
+    return color(r, g, b)
+
+
+def blend(frame, a, b, alpha):
+    # frame = a * (1 - alpha) + b * alpha for every channel of every pixel, as
+    # whole-buffer operations in both the NumPy and the plain Python path
+    level = lut.level(alpha)
+
+    if HAVE_NUMPY:
+        a_bytes = np.frombuffer(a.pixels, dtype=np.uint8).astype(np.uint16)
+        b_bytes = np.frombuffer(b.pixels, dtype=np.uint8).astype(np.uint16)
+        mixed = (a_bytes * (255 - level) + b_bytes * level) // 255
+        np.frombuffer(frame.pixels, dtype=np.uint8)[:] = mixed
+        return
+
+    # Scale every byte of each frame with bytes.translate and a linear row of
+    # the brightness table, then add the two frames as one big integer. Each
+    # byte of the sum is at most 255, so no carry crosses into its neighbour.
+    table = lut.brightness_table(1.0)
+    fade_out = table[(255 - level) * 256:(256 - level) * 256]
+    fade_in = table[level * 256:(level + 1) * 256]
+    total = (int.from_bytes(a.pixels.tobytes().translate(fade_out), "little") +
+             int.from_bytes(b.pixels.tobytes().translate(fade_in), "little"))
+    memoryview(frame.pixels).cast("B")[:] = total.to_bytes(len(frame) * frame.pixels.itemsize, "little")
+
+
+def wheel(frame, offset):
+    # Rainbow across the whole frame, pixel i showing wheel position (i + offset) % 256
+    length = len(frame)
+    offset %= 256
+    frame.pixels[:] = lut.wheel_strip(length)[offset:offset + length]
+
+
+def gradient(colors, length):
+    # Cached multi-stop gradient across length pixels; an (n, 3) uint8 array
+    # with NumPy, otherwise a list of (r, g, b)
+    if HAVE_NUMPY:
+        palette = tuple(tuple(stop) for stop in colors)
+        return lut.cached(("gradient_np", palette, length),
+                          lambda: np.array(lut.gradient(palette, length), dtype=np.uint8).reshape(length, 3))
+    return lut.gradient(colors, length)
+
+
+WAVE_SHAPES = ("sine", "triangle", "sawtooth", "square")
+
+
+def wave(length, phase, cycles_per_strip=1.0, peak=1.0, shape="sine", floor=0.0):
+    # Per-pixel floor..peak scale travelling along the strip, one of WAVE_SHAPES
+    if HAVE_NUMPY:
+        x = phase - np.arange(length) * cycles_per_strip / length
+        if shape == "sine":
+            level = (np.sin(2 * math.pi * x) + 1) / 2
+        else:
+            x = np.mod(x, 1.0)
+            if shape == "triangle":
+                level = 1 - np.abs(2 * x - 1)
+            elif shape == "sawtooth":
+                level = x
+            else:
+                level = (x < 0.5).astype(np.float64)
+        return floor + level * (peak - floor)
+
+    levels = []
+    for i in range(length):
+        x = phase - i * cycles_per_strip / length
+        if shape == "sine":
+            level = (math.sin(2 * math.pi * x) + 1) / 2
+        else:
+            x %= 1.0
+            if shape == "triangle":
+                level = 1 - abs(2 * x - 1)
+            elif shape == "sawtooth":
+                level = x
+            else:
+                level = 1.0 if x < 0.5 else 0.0
+        levels.append(floor + level * (peak - floor))
+    return levels
+
+
+def spread(values, length, scale=1.0):
+    # Per-pixel factor for draw(): each of values times scale, over an equal
+    # share of the strip. The pixel -> value index is cached per length.
+    count = len(values)
+    if HAVE_NUMPY:
+        index = lut.cached(("spread_np", count, length), lambda: np.arange(length) * count // length)
+        return np.take(values, index) * scale
+    index = lut.cached(("spread", count, length), lambda: [i * count // length for i in range(length)])
+    return [values[i] * scale for i in index]
+
+
+def draw(frame, colors, factor=1.0, start=0, stop=None, shift=0):
+    # Draw a gradient (from gradient()) scaled by factor, which may be a single
+    # number or one value per pixel. Pixels outside [start, stop) are cleared
+    # and shift rotates the gradient along the strip.
+    length = len(frame)
+    stop = length if stop is None else stop
+
+    if HAVE_NUMPY:
+        rgb = np.roll(colors, -shift, axis=0) if shift else colors
+        table = _brightness_table()
+        factor = np.asarray(factor, dtype=np.float64)
+        if factor.ndim:
+            levels = np.clip(factor * 255 + 0.5, 0, 255).astype(np.intp)
+            packed = _pack(table[levels[:, None], rgb])
+        else:
+            packed = _pack(table[lut.level(float(factor))][rgb])
+        if start > 0 or stop < length:
+            mask = np.zeros(length, dtype=bool)
+            mask[max(start, 0):max(stop, 0)] = True
+            packed[~mask] = 0
+        _view(frame)[:] = packed
+        return
+
+    table = lut.brightness_table()
+    per_pixel = isinstance(factor, (list, tuple))
+    row = 0 if per_pixel else lut.level(factor) * 256
+    pixels = []
+    for i in range(length):
+        if start <= i < stop:
+            if per_pixel:
+                row = lut.level(factor[i]) * 256
+            r, g, b = colors[(i + shift) % length]
+            pixels.append(color(table[row + r], table[row + g], table[row + b]))
+        else:
+            pixels.append(0)
+    frame.load(pixels)
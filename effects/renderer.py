@@ -0,0 +1,79 @@
+import threading
+from effects.scheduler import FrameScheduler
+from framebuffer import FrameBuffer
+
+
+class Channel:
+    def __init__(self, output):
+        self.output = output
+        self.frame = FrameBuffer(len(output))
+        self.segments = []  # (start pixel, EffectManager)
+
+
+class Renderer:
+    # One render clock for every LED segment. Each frame every active effect
+    # draws into its segment, the segments are copied into their channel's
+    # frame and each channel is pushed to its strip once.
+    def __init__(self, fps=60):
+        self.scheduler = FrameScheduler(fps)
+        self.channels = []
+        self.wakeup = threading.Event()
+        self.stop_event = threading.Event()
+
+        # A single worker for the life of the renderer; switching effects never
+        # creates or joins threads
+        self.thread = threading.Thread(target=self.worker, daemon=True)
+        self.thread.start()
+
+    def add_channel(self, output):
+        self.channels.append(Channel(output))
+        return len(self.channels) - 1
+
+    def add_segment(self, channel, start, effect_manager):
+        # led_strips.strip_configs() reports bad segment configs; this just
+        # keeps a segment from ever growing the channel's frame
+        if start < 0 or start + len(effect_manager.frame) > len(self.channels[channel].frame):
+            raise ValueError(f"Segment at pixel {start} doesn't fit on channel {channel}")
+        self.channels[channel].segments.append((start, effect_manager))
+
+    def layers(self):
+        return [layer for channel in self.channels for _, layer in channel.segments]
+
+    def worker(self):
+        # Render while anything is animating, otherwise sleep until woken
+        while not self.stop_event.is_set():
+            self.wakeup.wait()
+            self.wakeup.clear()
+            if self.stop_event.is_set():
+                break
+            self.scheduler.run(self.render_frame, self.stop_event)
+
+    def wake(self):
+        self.wakeup.set()
+
+    def render_frame(self, now):
+        for channel in self.channels:
+            drawn = False
+            for start, layer in channel.segments:
+                try:
+                    changed = layer.render(now)
+                except Exception as e:
+                    # A broken effect only stops its own segment; the render
+                    # thread carries on with the others
+                    print(f"Error rendering effect {layer.current_effect or 'fade'}: {e}")
+                    layer.failed()
+                    continue
+                if changed:
+                    channel.frame.pixels[start:start + len(layer.frame)] = layer.frame.pixels
+                    drawn = True
+            if drawn:
+                channel.output.show(channel.frame)
+
+        if not any(layer.busy() for layer in self.layers()):
+            # Back to sleep; wake() during this check leaves wakeup set
+            return False
+
+    def stop(self):
+        self.stop_event.set()
+        self.wakeup.set()
+        self.thread.join(timeout=2)
@@ -0,0 +1,33 @@
+import time
+
+
+class FrameScheduler:
+    def __init__(self, fps=60):
+        self.fps = fps
+        self.frames = 0   # frames rendered
+        self.dropped = 0  # frame slots skipped because rendering fell behind
+        self.lag = 0.0    # how late the last frame finished, in seconds
+
+    def run(self, render_frame, stop_event):
+        # Call render_frame(now) once per frame slot, now being the slot's
+        # time.monotonic() deadline, until it returns False or stop_event is
+        # set. Sleeps until the next deadline instead of a fixed delay, so
+        # render cost doesn't slow the animation; missed slots are dropped
+        # rather than rendered late.
+        deadline = time.monotonic()
+
+        while not stop_event.is_set():
+            if render_frame(deadline) is False:
+                break
+            self.frames += 1
+
+            interval = 1 / self.fps
+            deadline += interval
+            now = time.monotonic()
+            self.lag = max(0.0, now - deadline)
+            if now > deadline:
+                missed = int((now - deadline) / interval) + 1
+                self.dropped += missed
+                deadline += missed * interval
+
+            stop_event.wait(deadline - now)
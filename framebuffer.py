@@ -0,0 +1,105 @@
+import ctypes
+import threading
+from array import array
+
+# ws2811_led_t is a uint32_t, the same layout as array('I') on the Pi
+BULK_COPY = array('I').itemsize == 4
+
+
+def color(red, green, blue, white=0):
+    # Same packing as rpi_ws281x.Color, so buffers can be handed straight to the strip
+    return (white << 24) | (red << 16) | (green << 8) | blue
+
+
+def led_address(strip):
+    # Address of the strip's LED colour memory, so a frame can be copied in
+    # with one memmove: the ws2811_led_t array of an rpi_ws281x channel (only
+    # allocated once begin() has run), or the simulator's pixel array. None if
+    # there's no such memory to write to.
+    if not BULK_COPY:
+        return None
+    if hasattr(strip, "led_address"):
+        return strip.led_address()
+    try:
+        from rpi_ws281x import ws
+        return int(ws.ws2811_channel_t_leds_get(strip._channel)) or None
+    except (ImportError, AttributeError, TypeError):
+        return None
+
+
+class FrameBuffer:
+    def __init__(self, length):
+        self.length = length
+        # One packed 0xWWRRGGBB value per pixel
+        self.pixels = array('I', [0]) * length
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        return self.pixels[index]
+
+    def __setitem__(self, index, value):
+        self.pixels[index] = value
+
+    def fill(self, value):
+        self.pixels[:] = array('I', [value]) * self.length
+
+    def clear(self):
+        self.fill(0)
+
+    def load(self, values):
+        # Replace the whole frame from any sequence of packed colours
+        self.pixels[:] = array('I', values)
+
+    def flush(self, strip, address=None):
+        # Copy the whole frame into the strip's LED memory at address (see
+        # led_address()) in one go, instead of one setPixelColor() call per
+        # pixel. rpi_ws281x's slice assignment is no help here: it either
+        # rejects a sequence or loops over it in Python.
+        if address is not None:
+            count = min(self.length, strip.numPixels())
+            ctypes.memmove(address, self.pixels.buffer_info()[0], count * self.pixels.itemsize)
+            return
+
+        for i, value in enumerate(self.pixels):
+            strip.setPixelColor(i, value)
+
+
+class StripOutput:
+    # Sends frames to a PixelStrip, skipping the transfer when the frame is
+    # identical to the last one that went out
+    def __init__(self, strip):
+        self.strip = strip
+        self.length = strip.numPixels()
+        # Strips are begun before they're wrapped, so the LED memory exists
+        self.address = led_address(strip)
+        self.last_frame = None
+        self.sent = 0
+        self.skipped = 0
+        # Effect thread and MQTT callbacks can both push frames
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.length
+
+    def show(self, frame):
+        with self.lock:
+            if self.last_frame is not None and frame.pixels == self.last_frame:
+                self.skipped += 1
+                return False
+
+            frame.flush(self.strip, self.address)
+            self.strip.show()
+            self.sent += 1
+
+            if self.last_frame is None:
+                self.last_frame = array('I', frame.pixels)
+            else:
+                self.last_frame[:] = frame.pixels
+            return True
+
+    def invalidate(self):
+        # Force the next frame out, e.g. after something else wrote to the strip
+        with self.lock:
+            self.last_frame = None
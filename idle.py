@@ -0,0 +1,198 @@
+import fcntl
+import glob
+import os
+import select
+import threading
+import time
+
+# linux/input.h: _IOW('E', 0x90, int), exclusive access to an input device
+EVIOCGRAB = 0x40044590
+
+# Presence topic payloads that mean someone is there
+PRESENT_PAYLOADS = {"on", "true", "1", "home", "detected", "occupied"}
+
+
+class IdlePolicy:
+    # Dims and then blanks the display when nobody has touched it (and the
+    # optional presence topic doesn't say someone is there) for a while, and
+    # throttles the LED frame rate while it's blanked. Input devices are
+    # watched with epoll on one thread, so a touch wakes the display within a
+    # few milliseconds. The touch that wakes a blank screen is swallowed
+    # rather than passed on to the browser.
+    def __init__(self, config, screen_manager, renderer):
+        idle_config = config['device'].get('idle', {})
+        self.enabled = idle_config.get('enabled', False)
+        self.dim_after = idle_config.get('dim_after', 120)       # seconds idle before dimming
+        self.blank_after = idle_config.get('blank_after', 600)   # seconds idle before blanking
+        self.dim_brightness = idle_config.get('dim_brightness', 20)
+        self.led_fps = idle_config.get('led_fps', 15)            # LED frame rate while blanked
+        self.presence_topic = idle_config.get('presence_topic')
+
+        self.screen_manager = screen_manager
+        self.renderer = renderer
+
+        self.state = "active"  # "active", "dimmed" or "blanked"
+        self.last_activity = time.monotonic()
+        self.present = False
+        self.restore_brightness = None  # brightness to go back to on wake
+        self.idle_target = None          # brightness we set when dimming/blanking
+        self.restore_fps = None
+
+        self.devices = {}  # fd: path
+        self.wake_read, self.wake_write = os.pipe()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if not self.enabled:
+            return
+        self.thread = threading.Thread(target=self.worker, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        os.write(self.wake_write, b"\0")
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+
+    def setup_control(self, mqtt_client):
+        if not self.enabled or not self.presence_topic:
+            return
+        mqtt_client.subscribe(self.presence_topic)
+        mqtt_client.message_callback_add(self.presence_topic, self.handle_presence)
+
+    def handle_presence(self, client, userdata, msg):
+        present = msg.payload.decode().strip().lower() in PRESENT_PAYLOADS
+        if self.present and not present:
+            # The idle countdown starts from when they left
+            self.last_activity = time.monotonic()
+        self.present = present
+        print(f"Presence: {'present' if self.present else 'away'}")
+        # Let the idle thread act on it straight away
+        os.write(self.wake_write, b"\0")
+
+    def open_devices(self, epoll):
+        for path in sorted(glob.glob('/dev/input/event*')):
+            try:
+                fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+            except OSError as e:
+                print(f"Can't watch {path} for activity: {e}")
+                continue
+            self.devices[fd] = path
+            epoll.register(fd, select.EPOLLIN)
+
+    def close_device(self, epoll, fd):
+        epoll.unregister(fd)
+        os.close(fd)
+        del self.devices[fd]
+
+    def grab(self, grabbed):
+        for fd, path in self.devices.items():
+            try:
+                fcntl.ioctl(fd, EVIOCGRAB, 1 if grabbed else 0)
+            except OSError as e:
+                print(f"Can't {'grab' if grabbed else 'release'} {path}: {e}")
+
+    def worker(self):
+        epoll = select.epoll()
+        epoll.register(self.wake_read, select.EPOLLIN)
+        self.open_devices(epoll)
+        print(f"Idle policy watching {len(self.devices)} input devices")
+
+        while not self.stop_event.is_set():
+            deadline = self.next_deadline()
+            timeout = -1 if deadline is None else max(0.0, deadline - time.monotonic())
+            active = False
+            for fd, events in epoll.poll(timeout):
+                if fd == self.wake_read:
+                    os.read(fd, 64)
+                    continue
+                if events & (select.EPOLLERR | select.EPOLLHUP):
+                    # Unplugged
+                    self.close_device(epoll, fd)
+                    continue
+                # Drain the events; any input at all counts as activity
+                try:
+                    while os.read(fd, 4096):
+                        pass
+                except BlockingIOError:
+                    pass
+                active = True
+
+            if active or self.present:
+                self.activity()
+            self.update()
+
+        if self.state == "blanked" and self.idle_target == 0:
+            self.grab(False)
+        for fd in list(self.devices):
+            self.close_device(epoll, fd)
+        epoll.close()
+
+    def next_deadline(self):
+        # When the next idle step is due, or None if there isn't one
+        if self.present:
+            return None
+        if self.state == "active" and self.dim_after:
+            return self.last_activity + self.dim_after
+        if self.state in ("active", "dimmed") and self.blank_after:
+            return self.last_activity + self.blank_after
+        return None
+
+    def activity(self):
+        self.last_activity = time.monotonic()
+        if self.state != "active":
+            self.wake()
+
+    def update(self):
+        if self.present:
+            return
+        idle = time.monotonic() - self.last_activity
+        if self.blank_after and idle >= self.blank_after and self.state != "blanked":
+            self.blank()
+        elif self.dim_after and idle >= self.dim_after and self.state == "active":
+            self.dim()
+
+    def remember_brightness(self):
+        if self.state == "active" and self.screen_manager.backlight is not None:
+            self.restore_brightness = self.screen_manager.get_current_screen_brightness()
+
+    def dim(self):
+        print("Idle: dimming display")
+        self.remember_brightness()
+        self.state = "dimmed"
+        if self.restore_brightness is not None and self.restore_brightness > self.dim_brightness:
+            self.idle_target = self.dim_brightness
+            self.screen_manager.fade_to(self.dim_brightness)
+
+    def blank(self):
+        print("Idle: blanking display")
+        self.remember_brightness()
+        self.state = "blanked"
+        if self.restore_brightness is not None:
+            self.idle_target = 0
+            self.screen_manager.fade_to(0)
+        if self.idle_target == 0:
+            # Keep the waking touch from reaching the browser; only when the
+            # screen really is dark, or it would just eat a touch
+            self.grab(True)
+
+        self.restore_fps = self.renderer.scheduler.fps
+        self.renderer.scheduler.fps = min(self.led_fps, self.restore_fps)
+
+    def wake(self):
+        # Straight back to full brightness, no fade, so a touch gets an
+        # immediate response
+        if self.state == "blanked":
+            if self.idle_target == 0:
+                self.grab(False)
+            if self.restore_fps is not None:
+                self.renderer.scheduler.fps = self.restore_fps
+                self.restore_fps = None
+        print("Idle: waking display")
+        self.state = "active"
+
+        # Leave the brightness alone if HA changed it while we were idle
+        if self.restore_brightness is not None and self.screen_manager.fade_target in (None, self.idle_target):
+            self.screen_manager.fade_to(self.restore_brightness, 0)
+        self.idle_target = None
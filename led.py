@@ -1,35 +1,31 @@
 
 import json
-import time
-from rpi_ws281x import PixelStrip, Color
-from effects.manager import EffectManager
+from led_commands import CommandQueue
 
 class LEDManager:
-    def __init__(self, config, mqtt_client):
+    # One Home Assistant light, covering a segment of one of the strips in LEDStrips
+    def __init__(self, config, mqtt_client, segment):
         self.config = config
         self.mqtt_client = mqtt_client
         self.device_name = self.config['device']['name']
         self.device_id = self.config['device']['id']
 
-        self.led_count = self.config['device']['led_pixel_count']
-        self.led_pin = self.config['device']['led_control_pin']
-        self.led_freq_hz = 800000
-        self.led_dma = 10
-        self.led_brightness = 255
-        self.led_invert = False
-        self.led_channel = 0
-
-        self.strip = PixelStrip(self.led_count, self.led_pin, self.led_freq_hz,
-                                self.led_dma, self.led_invert, self.led_brightness, self.led_channel)
-        self.strip.begin()
+        # Segments without a name are the whole-strip light of older configs
+        self.light_name = self.device_name
+        if segment['name']:
+            self.light_name = f"{self.device_name} {segment['name']}"
+        self.effect_manager = segment['effect_manager']
 
         self.state = 'OFF'
         self.brightness = 255
         self.rgb = [255, 255, 255]
         self.current_effect = "off"
-        self.effect_manager = EffectManager()
+        # Default fade time in seconds when a command has no "transition"
+        self.transition = self.config['device'].get('led_transition', 0.4)
+        # MQTT callbacks only queue commands; bursts are merged and applied once per frame
+        self.commands = CommandQueue(self.apply_commands, self.publish_state, 1 / self.effect_manager.renderer.scheduler.fps)
 
-        base = f"{self.config['mqtt']['base_topic']}/light/{self.device_name.lower().replace(' ', '_')}"
+        base = f"{self.config['mqtt']['base_topic']}/light/{self.light_name.lower().replace(' ', '_')}"
         self.state_topic = f"{base}/state"
         self.brightness_topic = f"{base}/brightness/state"
         self.rgb_topic = f"{base}/rgb/state"
@@ -39,54 +35,36 @@ class LEDManager:
         self.effect_command_topic = f"{base}/effect/set"
         self.effect_state_topic = f"{base}/effect/state"
 
-    def set_rgb(self, red, green, blue):
-        for i in range(self.strip.numPixels()):
-            self.strip.setPixelColor(i, Color(red, green, blue))
-        self.strip.show()
+        # Built and serialised once; rebuilt only when the effect list changes
+        self.discovery = self.build_discovery()
+
+    def scaled_rgb(self):
+        return [int(c * (self.brightness / 255)) for c in self.rgb]
 
-    def turn_on(self):
+    def turn_on(self, transition=None):
         if self.state == 'ON':
             return
 
         self.state = 'ON'
-        target_brightness = self.brightness
-        self.set_rgb(0, 0, 0)  # Start from dark
-
-        steps = 20
-        delay = 0.02
+        # Fades up from whatever is showing (dark, or part way through a fade out)
+        self.apply_light(transition)
 
-        for i in range(1, steps + 1):
-            factor = i / steps
-            scaled_rgb = [int(c * factor * (target_brightness / 255)) for c in self.rgb]
-            self.set_rgb(*scaled_rgb)
-            time.sleep(delay)
 
-        self.apply_light()  # Ensure final color is accurate
-
-
-    def turn_off(self):
+    def turn_off(self, transition=None):
         # Tell HA to clear the effect BEFORE light goes off
         if hasattr(self, "effect_command_topic"):
-            self.mqtt_client.publish(self.effect_command_topic, "off")
-            time.sleep(0.1)  # Small delay to let HA process it before OFF
+            # Forced: HA may have set another effect on this topic since we last sent "off"
+            self.mqtt_client.publish(self.effect_command_topic, "off", force=True)
 
         self.state = 'OFF'
+        transition = self.transition if transition is None else transition
 
-        # Stop any running effect
-        if hasattr(self, "effect_manager"):
-            self.effect_manager.stop()
-
-        # Fade out current color
-        steps = 20
-        delay = 0.02
-        for i in range(steps, 0, -1):
-            factor = i / steps
-            r, g, b = [int(c * factor * (self.brightness / 255)) for c in self.rgb]
-            self.set_rgb(r, g, b)
-            time.sleep(delay)
-
-        # Fully off
-        self.set_rgb(0, 0, 0)
+        # Stop any running effect and fade out from its colour, otherwise fade
+        # out from whatever is showing
+        if self.effect_manager.current_effect:
+            self.effect_manager.fade([0, 0, 0], transition, start=self.scaled_rgb())
+        else:
+            self.effect_manager.fade([0, 0, 0], transition)
 
         # Let HA know the effect is now off
         if hasattr(self, "effect_command_topic"):
@@ -94,38 +72,77 @@ class LEDManager:
 
 
 
-    def set_brightness(self, brightness):
+    def set_brightness(self, brightness, transition=None):
         self.brightness = int(brightness)
-        self.apply_light()
+        self.apply_light(transition)
 
         # Update effect color if running
         if hasattr(self, "effect_manager"):
             self.effect_manager.update_color(self.rgb, self.brightness)
 
 
-    def set_color(self, rgb):
+    def parse_color(self, rgb):
         if isinstance(rgb, dict):
-            self.rgb = [rgb.get("r", 0), rgb.get("g", 0), rgb.get("b", 0)]
+            return [rgb.get("r", 0), rgb.get("g", 0), rgb.get("b", 0)]
         elif isinstance(rgb, str):
-            self.rgb = list(map(int, rgb.split(',')))
-        else:
-            print(f"Unsupported color format: {rgb}")
-        self.apply_light()
+            return list(map(int, rgb.split(',')))
+        print(f"Unsupported color format: {rgb}")
+        return self.rgb
+
+    def set_color(self, rgb, transition=None):
+        self.rgb = self.parse_color(rgb)
+        self.apply_light(transition)
 
         # Update effect color if running
         if hasattr(self, "effect_manager"):
             self.effect_manager.update_color(self.rgb, self.brightness)
 
 
-    def apply_light(self):
+    def apply_light(self, transition=None):
+        # Fades run on the effect manager's render clock, so this returns at once
         if self.state == 'ON' and self.current_effect == "off":
-            scaled_rgb = [int(color * (self.brightness / 255)) for color in self.rgb]
-            self.set_rgb(*scaled_rgb)
+            transition = self.transition if transition is None else transition
+            self.effect_manager.fade(self.scaled_rgb(), transition)
 
-    def setup_discovery(self):
-        discovery_topic = f"{self.config['mqtt']['base_topic']}/light/{self.device_name.lower().replace(' ', '_')}/config"
+    def set_effect(self, effect):
+        self.current_effect = effect
+
+        if effect == "off":
+            if self.state == 'ON':
+                # Crossfades from the effect back to the solid colour
+                self.apply_light()
+            elif self.effect_manager.current_effect:
+                # Only stop a running effect; a fade in progress carries on
+                self.effect_manager.stop()
+        else:
+            self.effect_manager.start(effect, self.rgb, self.brightness)
+
+    def apply_commands(self, changes):
+        # Called by the command queue with the merged result of a burst of commands
+        transition = changes.get('transition')
+
+        if 'brightness' in changes:
+            self.brightness = int(changes['brightness'])
+        if 'color' in changes:
+            self.rgb = self.parse_color(changes['color'])
+        self.effect_manager.update_color(self.rgb, self.brightness)
+
+        state = changes.get('state')
+        if state == 'OFF':
+            self.turn_off(transition)
+        elif state == 'ON' and self.state != 'ON':
+            self.turn_on(transition)
+        elif 'brightness' in changes or 'color' in changes:
+            self.apply_light(transition)
+
+        if 'effect' in changes:
+            self.set_effect(changes['effect'])
+
+    def build_discovery(self):
+        # (discovery topic, JSON payload)
+        discovery_topic = f"{self.config['mqtt']['base_topic']}/light/{self.light_name.lower().replace(' ', '_')}/config"
         discovery_payload = {
-            "name": self.device_name,
+            "name": self.light_name,
             "schema": "json",
             "supported_color_modes": ["rgb"],
             "state_topic": self.state_topic,
@@ -136,8 +153,8 @@ class LEDManager:
             "rgb_command_topic": self.rgb_command_topic,
             "effect_state_topic": self.effect_state_topic,
             "effect_command_topic": self.effect_command_topic,
-            "effect_list": ["off", "rainbow", "chase", "alert", "breathe", "blink_soft", "chase_soft"],
-            "unique_id": f"{self.device_name.lower().replace(' ', '_')}_{self.device_id}",
+            "effect_list": ["off"] + self.effect_manager.registry.names(),
+            "unique_id": f"{self.light_name.lower().replace(' ', '_')}_{self.device_id}",
             "device": {
                 "identifiers": [self.device_id],
                 "name": self.device_name,
@@ -145,8 +162,11 @@ class LEDManager:
                 "manufacturer": "Aled Evans"
             }
         }
-        self.mqtt_client.publish(discovery_topic, json.dumps(discovery_payload))
-        print(f"Published discovery for {self.device_name}")
+        return discovery_topic, json.dumps(discovery_payload)
+
+    def setup_discovery(self):
+        self.mqtt_client.publish(*self.discovery, force=True)
+        print(f"Published discovery for {self.light_name}")
 
     def setup_control(self):
         self.mqtt_client.subscribe(self.command_topic)
@@ -168,19 +188,24 @@ class LEDManager:
             payload = {"state": raw}
 
         try:
+            changes = {}
+
+            # HA sends the fade time in seconds as "transition"
+            if payload.get('transition') is not None:
+                changes['transition'] = float(payload['transition'])
+
             if 'state' in payload:
-                if payload['state'].upper() == 'ON':
-                    self.turn_on()
-                elif payload['state'].upper() == 'OFF':
-                    self.turn_off()
+                state = payload['state'].upper()
+                if state in ('ON', 'OFF'):
+                    changes['state'] = state
 
             if 'brightness' in payload:
-                self.set_brightness(payload['brightness'])
+                changes['brightness'] = int(payload['brightness'])
 
             if 'color' in payload:
-                self.set_color(payload['color'])
+                changes['color'] = payload['color']
 
-            self.publish_state()
+            self.commands.put(**changes)
         except Exception as e:
             print(f"Error applying state command: {e}")
 
@@ -188,16 +213,13 @@ class LEDManager:
         try:
             brightness = int(msg.payload.decode())
             print(f"Brightness command: {brightness}")
-            self.set_brightness(brightness)
-            self.publish_state()
+            self.commands.put(brightness=brightness)
         except Exception as e:
             print(f"Error handling brightness command: {e}")
 
     def handle_rgb_command(self, client, userdata, msg):
         try:
-            rgb = msg.payload.decode()
-            self.set_color(rgb)
-            self.publish_state()
+            self.commands.put(color=msg.payload.decode())
         except Exception as e:
             print(f"Error handling RGB command: {e}")
 
@@ -205,15 +227,7 @@ class LEDManager:
         try:
             effect = msg.payload.decode().strip()
             print(f"Effect command: {effect}")
-            self.current_effect = effect
-
-            if effect == "off":
-                self.effect_manager.stop()
-                self.apply_light()
-            else:
-                self.effect_manager.start(effect, self.strip, self.rgb, self.brightness)
-
-            self.publish_effect(effect)
+            self.commands.put(effect=effect)
         except Exception as e:
             print(f"Error handling effect command: {e}")
 
@@ -228,5 +242,3 @@ class LEDManager:
 
     def cleanup(self):
         self.effect_manager.stop()
-        self.set_rgb(0, 0, 0)
-        time.sleep(1)
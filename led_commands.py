@@ -0,0 +1,56 @@
+import threading
+import time
+
+
+class CommandQueue:
+    # Merges bursts of light commands (e.g. HA slider drags) into the latest
+    # desired state. A worker thread hands the merged changes to apply() at most
+    # once per frame and calls on_idle() once the burst has gone quiet.
+    def __init__(self, apply, on_idle, interval):
+        self.apply = apply
+        self.on_idle = on_idle
+        self.interval = interval
+
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+
+        self.received = 0
+        self.applied = 0
+
+        self.thread = threading.Thread(target=self.worker, daemon=True)
+        self.thread.start()
+
+    def put(self, **changes):
+        # Later values for the same field replace earlier ones
+        with self.lock:
+            self.pending.update(changes)
+            self.received += 1
+        self.wakeup.set()
+
+    def worker(self):
+        busy = False
+        while True:
+            if not self.wakeup.wait(self.interval if busy else None):
+                # Nothing new for a whole frame, so the burst is over
+                busy = False
+                try:
+                    self.on_idle()
+                except Exception as e:
+                    print(f"Error finishing LED command burst: {e}")
+                continue
+
+            self.wakeup.clear()
+            with self.lock:
+                changes, self.pending = self.pending, {}
+
+            if changes:
+                try:
+                    self.apply(changes)
+                except Exception as e:
+                    print(f"Error applying LED commands: {e}")
+                self.applied += 1
+                busy = True
+
+            # Apply at most once per frame
+            time.sleep(self.interval)
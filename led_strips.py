@@ -0,0 +1,305 @@
+import atexit
+import json
+import os
+import audio
+import screen_capture
+from framebuffer import FrameBuffer, StripOutput
+from effects.manager import EffectManager
+from effects.registry import EffectRegistry
+from effects.renderer import Renderer
+from effects import lut
+from simulator import SimulatedStrip
+
+# rpi_ws281x drives a strip from the PWM, PCM or SPI peripheral depending on
+# its pin, and each pin only works on one of its two channels:
+# pin: (peripheral, channel)
+PIN_CHANNELS = {
+    12: ("pwm", 0), 18: ("pwm", 0), 40: ("pwm", 0), 52: ("pwm", 0),
+    13: ("pwm", 1), 19: ("pwm", 1), 41: ("pwm", 1), 45: ("pwm", 1), 53: ("pwm", 1),
+    21: ("pcm", 0), 31: ("pcm", 0),
+    10: ("spi", 0), 38: ("spi", 0),
+}
+# Strips on the two PWM channels share one ws2811_t (see PWMStrips), and so a
+# DMA channel and frequency; every other strip has its own and needs its own
+# DMA channel. Defaults are handed out from here up.
+DMA_CHANNEL = 10
+
+
+def check_segments(strip_index, pixel_count, segments):
+    # Segments have to fit on the strip and not overlap, or the renderer would
+    # grow the strip's frame past its length
+    taken = []
+    for segment in segments:
+        start, count = segment['start'], segment['count']
+        name = segment.get('name') or f"strip {strip_index + 1}"
+        if start < 0 or count < 1 or start + count > pixel_count:
+            raise ValueError(f"Segment {name} (pixels {start}-{start + count - 1}) doesn't fit "
+                             f"on strip {strip_index + 1} ({pixel_count} pixels)")
+        for other, other_start, other_count in taken:
+            if start < other_start + other_count and other_start < start + count:
+                raise ValueError(f"Segment {name} overlaps segment {other} on strip {strip_index + 1}")
+        taken.append((name, start, count))
+
+
+def check_strips(configs):
+    used = {}  # (peripheral, channel): pin
+    dma = {}   # DMA channel: what uses it, one entry for all the PWM strips
+    for config in configs:
+        pin, channel = config['pin'], config['channel']
+        if pin not in PIN_CHANNELS:
+            raise ValueError(f"GPIO {pin} can't drive a strip; use a PWM (12, 13, 18, 19), PCM (21) or SPI (10) pin")
+        peripheral, pin_channel = PIN_CHANNELS[pin]
+        if channel != pin_channel:
+            raise ValueError(f"GPIO {pin} only works on channel {pin_channel}, not {channel}")
+        if (peripheral, channel) in used:
+            raise ValueError(f"GPIO {used[peripheral, channel]} and {pin} are both on "
+                             f"{peripheral.upper()} channel {channel}")
+        used[peripheral, channel] = pin
+
+        user = "PWM strips" if peripheral == "pwm" else f"GPIO {pin}"
+        if dma.setdefault(config['dma'], user) != user:
+            raise ValueError(f"{dma[config['dma']]} and {user} both use DMA channel {config['dma']}")
+
+    pwm = [config for config in configs if PIN_CHANNELS[config['pin']][0] == "pwm"]
+    for key in ('dma', 'freq_hz'):
+        if len({config[key] for config in pwm}) > 1:
+            raise ValueError(f"Strips on PWM pins are driven together and need the same {key}")
+
+
+def assign_dma(strips, configs):
+    # Explicit DMA channels first, then the PWM strips share one default and
+    # every other strip gets the next free channel
+    taken = {strip['dma'] for strip in strips if 'dma' in strip}
+    pwm_dma = next((strip['dma'] for strip in strips
+                    if 'dma' in strip and PIN_CHANNELS.get(strip['pin'], ("",))[0] == "pwm"), None)
+    next_dma = DMA_CHANNEL
+    for strip, config in zip(strips, configs):
+        if 'dma' in strip:
+            config['dma'] = strip['dma']
+            continue
+        pwm = PIN_CHANNELS.get(strip['pin'], ("",))[0] == "pwm"
+        if pwm and pwm_dma is not None:
+            config['dma'] = pwm_dma
+            continue
+        while next_dma in taken:
+            next_dma += 1
+        config['dma'] = next_dma
+        taken.add(next_dma)
+        if pwm:
+            pwm_dma = next_dma
+
+
+def strip_configs(device_config):
+    # The strips listed in device.led_strips, or the single strip described by
+    # led_control_pin / led_pixel_count on older configs
+    strips = device_config.get('led_strips') or [{
+        "pin": device_config['led_control_pin'],
+        "pixel_count": device_config['led_pixel_count'],
+    }]
+
+    # "ws281x" drives real strips, "simulator" uses SimulatedStrip with the
+    # options in led_simulator (record, max_frames, realtime)
+    backend = device_config.get('led_backend', 'ws281x')
+    simulator = device_config.get('led_simulator', {})
+
+    configs = []
+    for index, strip in enumerate(strips):
+        configs.append({
+            "backend": backend,
+            "simulator": simulator,
+            "index": index,
+            "pin": strip['pin'],
+            "pixel_count": strip['pixel_count'],
+            "channel": strip.get('channel', PIN_CHANNELS.get(strip['pin'], (None, 0))[1]),
+            "freq_hz": strip.get('freq_hz', 800000),
+            "invert": strip.get('invert', False),
+            # No segments means the whole strip is one light, named after the
+            # device for the first strip so older configs keep their topics
+            "segments": strip.get('segments') or [{
+                "name": f"Strip {index + 1}" if index else None,
+                "start": 0,
+                "count": strip['pixel_count'],
+            }],
+        })
+        check_segments(index, strip['pixel_count'], configs[-1]['segments'])
+
+    assign_dma(strips, configs)
+    if backend == 'ws281x':
+        check_strips(configs)
+    return configs
+
+
+class PWMStrips:
+    # Both PWM channels driven from one ws2811_t. rpi_ws281x sets up the PWM
+    # block and its DMA channel in ws2811_init, so two PixelStrips (two inits)
+    # can't run PWM0 and PWM1 together; this builds the one ws2811_t by hand
+    # with the library's low-level ws API and hands each channel out as a
+    # PixelStrip-like PWMChannel.
+    def __init__(self, freq_hz, dma):
+        # Only importable on a Pi
+        from rpi_ws281x import ws
+        self.ws = ws
+        self.leds = ws.new_ws2811_t()
+        for channel in range(2):
+            # Unused until add()ed; a count of 0 leaves the channel off
+            handle = ws.ws2811_channel_get(self.leds, channel)
+            ws.ws2811_channel_t_count_set(handle, 0)
+            ws.ws2811_channel_t_gpionum_set(handle, 0)
+            ws.ws2811_channel_t_invert_set(handle, 0)
+            ws.ws2811_channel_t_brightness_set(handle, 0)
+        ws.ws2811_t_freq_set(self.leds, freq_hz)
+        ws.ws2811_t_dmanum_set(self.leds, dma)
+        self.started = False
+
+    def add(self, num, pin, invert, brightness, channel):
+        ws = self.ws
+        handle = ws.ws2811_channel_get(self.leds, channel)
+        ws.ws2811_channel_t_count_set(handle, num)
+        ws.ws2811_channel_t_gpionum_set(handle, pin)
+        ws.ws2811_channel_t_invert_set(handle, 1 if invert else 0)
+        ws.ws2811_channel_t_brightness_set(handle, brightness)
+        ws.ws2811_channel_t_strip_type_set(handle, ws.WS2811_STRIP_GRB)
+        return PWMChannel(self, handle, num)
+
+    def check(self, result, call):
+        if result != 0:
+            raise RuntimeError(f"{call} failed with code {result} ({self.ws.ws2811_get_return_t_str(result)})")
+
+    def begin(self):
+        # Once, after every channel has been added
+        if self.started:
+            return
+        self.check(self.ws.ws2811_init(self.leds), "ws2811_init")
+        self.started = True
+        atexit.register(self.cleanup)
+
+    def render(self):
+        # Sends both channels; the unchanged one just repeats its last frame
+        self.check(self.ws.ws2811_render(self.leds), "ws2811_render")
+
+    def cleanup(self):
+        if self.leds is not None:
+            if self.started:
+                self.ws.ws2811_fini(self.leds)
+            self.ws.delete_ws2811_t(self.leds)
+            self.leds = None
+
+
+class PWMChannel:
+    # One channel of a PWMStrips, with the parts of PixelStrip's interface
+    # StripOutput and boot.py use. _channel is named as in PixelStrip, so
+    # framebuffer.led_address() finds the LED memory the same way.
+    def __init__(self, strips, channel, num):
+        self.strips = strips
+        self._channel = channel
+        self.size = num
+
+    def begin(self):
+        self.strips.begin()
+
+    def numPixels(self):
+        return self.size
+
+    def setPixelColor(self, n, color):
+        self.strips.ws.ws2811_led_set(self._channel, n, color)
+
+    def getPixelColor(self, n):
+        return self.strips.ws.ws2811_led_get(self._channel, n)
+
+    def show(self):
+        self.strips.render()
+
+    def _cleanup(self):
+        self.strips.cleanup()
+
+
+def create_strips(configs):
+    # A begun strip for each config, in order
+    strips = []
+    pwm = None
+    for strip_config in configs:
+        args = (strip_config['pixel_count'], strip_config['pin'], strip_config['freq_hz'],
+                strip_config['dma'], strip_config['invert'], 255, strip_config['channel'])
+
+        if strip_config['backend'] == 'simulator':
+            options = dict(strip_config['simulator'])
+            if options.get('record'):
+                # e.g. "frames-{channel}.bin" to keep one recording per strip
+                options['record'] = options['record'].format(channel=strip_config['index'])
+            strips.append(SimulatedStrip(*args, **options))
+        elif PIN_CHANNELS[strip_config['pin']][0] == "pwm":
+            if pwm is None:
+                pwm = PWMStrips(strip_config['freq_hz'], strip_config['dma'])
+            strips.append(pwm.add(strip_config['pixel_count'], strip_config['pin'], strip_config['invert'],
+                                  255, strip_config['channel']))
+        else:
+            # Only importable on a Pi
+            from rpi_ws281x import PixelStrip
+            strips.append(PixelStrip(*args))
+
+    for strip in strips:
+        strip.begin()
+    return strips
+
+
+class LEDStrips:
+    def __init__(self, config):
+        device_config = config['device']
+
+        # Gamma used by the effects' brightness lookup table
+        lut.GAMMA = device_config.get('led_gamma', 1.0)
+        # Input for the audio_* effects, opened when one of them first runs
+        audio.configure(device_config.get('audio', {}))
+        # Capture for the ambient effect, sampling the display the kiosk runs on
+        ambient = dict(device_config.get('ambient', {}))
+        ambient.setdefault('output', device_config.get('display_name'))
+        screen_capture.configure(ambient)
+
+        # One render pass per frame covers every segment on every strip
+        self.renderer = Renderer(device_config.get('led_fps', 60))
+        self.outputs = []
+        self.segments = []
+
+        # Built-in effects plus any found in led_effects_dir or installed under
+        # the "homeslate.effects" entry point group
+        self.effects_dir = device_config.get('led_effects_dir')
+        self.registry = EffectRegistry(self.effects_dir)
+
+        configs = strip_configs(device_config)
+        for strip_config, strip in zip(configs, create_strips(configs)):
+            output = StripOutput(strip)
+            channel = self.renderer.add_channel(output)
+            self.outputs.append(output)
+
+            for segment in strip_config['segments']:
+                effect_manager = EffectManager(self.renderer, segment['count'], device_config.get('led_crossfade', 0.5),
+                                               self.registry)
+                self.renderer.add_segment(channel, segment['start'], effect_manager)
+                self.segments.append({
+                    "name": segment.get('name'),
+                    "effect_manager": effect_manager,
+                })
+
+    def define_effect(self, spec):
+        # Register a declarative effect (effects/dsl.py) sent at runtime, and keep
+        # it in led_effects_dir so it's still there after a restart. The file
+        # name is the validated effect name (see dsl.NAME_PATTERN), never
+        # anything else from the payload.
+        metadata = self.registry.define(spec)
+        if self.effects_dir:
+            os.makedirs(self.effects_dir, exist_ok=True)
+            path = os.path.join(self.effects_dir, f"{metadata['name']}.json")
+            if os.path.dirname(os.path.abspath(path)) != os.path.abspath(self.effects_dir):
+                raise ValueError(f"Invalid effect name {metadata['name']!r}")
+            with open(path, "w") as f:
+                json.dump(spec, f, indent=4)
+        print(f"Defined effect: {metadata['name']}")
+        return metadata
+
+    def cleanup(self):
+        self.renderer.stop()
+        audio.stop()
+        screen_capture.stop()
+        for output in self.outputs:
+            output.show(FrameBuffer(len(output)))
+            print(f"LED frames sent: {output.sent}, skipped as unchanged: {output.skipped}")
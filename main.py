@@ -1,30 +1,55 @@
 
-import time
+import asyncio
 import json
 import subprocess
 from mqtt_client import MQTTClient
+from runtime import Runtime
 from sensors import SensorManager
 from screen import ScreenManager
 from browser import BrowserManager
 from led import LEDManager
+from led_strips import LEDStrips, strip_configs
+from idle import IdlePolicy
 from boot import run_boot_effect
 
+# Seconds between runs of each periodic job
+SENSOR_INTERVAL = 10
+SCREEN_STATUS_INTERVAL = 10
+LED_STATE_INTERVAL = 10
+BROWSER_CHECK_INTERVAL = 5
 
 # Load config from config.json
 def load_config():
     with open("config.json", "r") as config_file:
         return json.load(config_file)
 
-def setup_ws281x_pwm_module():
+# RP1 (Pi 5) pin function and PWM0 channel for each PWM-capable pin
+RP1_PWM_PINS = {12: ("a0", 0), 13: ("a0", 1), 18: ("a3", 2), 19: ("a3", 3)}
+
+def setup_ws281x_pwm_module(config):
     module_path = "/home/aled/rpi_ws281x/rp1_ws281x_pwm/rp1_ws281x_pwm.ko"
     overlay_dir = "/home/aled/rpi_ws281x/rp1_ws281x_pwm"
 
+    if config['device'].get('led_backend', 'ws281x') != 'ws281x':
+        return
+    # strip_configs() allows one strip per PWM channel
+    pins = [strip['pin'] for strip in strip_configs(config['device'])]
+    pwm_pins = [pin for pin in pins if pin in RP1_PWM_PINS]
+    for pin in pins:
+        if pin not in RP1_PWM_PINS:
+            print(f"GPIO {pin} isn't a PWM pin; the rp1_ws281x_pwm module won't drive it")
+    if not pwm_pins:
+        return
+    # The module takes a single pwm_channel, so it's set up for the first PWM
+    # strip; the pins of any others are still switched to PWM below
+    pwm_channel = RP1_PWM_PINS[pwm_pins[0]][1]
+
     # Check if module is already loaded
     try:
         lsmod_output = subprocess.check_output(["lsmod"]).decode()
         if "rp1_ws281x_pwm" not in lsmod_output:
             print("Inserting rp1_ws281x_pwm module...")
-            subprocess.run(["sudo", "insmod", module_path, "pwm_channel=2"], check=True)
+            subprocess.run(["sudo", "insmod", module_path, f"pwm_channel={pwm_channel}"], check=True)
         else:
             print("rp1_ws281x_pwm module already loaded.")
     except Exception as e:
@@ -38,17 +63,18 @@ def setup_ws281x_pwm_module():
         print(f"Failed to apply dtoverlay: {e}")
 
     # Set pin control
-    try:
-        print("Setting pinctrl for GPIO 18...")
-        subprocess.run(["sudo", "pinctrl", "set", "18", "a3", "pn"], check=True)
-    except Exception as e:
-        print(f"Failed to set pinctrl: {e}")
+    for pin in pwm_pins:
+        try:
+            print(f"Setting pinctrl for GPIO {pin}...")
+            subprocess.run(["sudo", "pinctrl", "set", str(pin), RP1_PWM_PINS[pin][0], "pn"], check=True)
+        except Exception as e:
+            print(f"Failed to set pinctrl: {e}")
 
 # Main entry point for the program
 def main():
-    setup_ws281x_pwm_module()
     global config
     config = load_config()
+    setup_ws281x_pwm_module(config)
 
 
 
@@ -60,22 +86,78 @@ def main():
     # Create MQTT client
     mqtt_client = MQTTClient("config.json")
 
+    # Periodic jobs and anything slow from MQTT callbacks run here
+    runtime = Runtime()
+
     # Set up managers
-    sensor_manager = SensorManager(config, mqtt_client.client)
-    screen_manager = ScreenManager(config, mqtt_client.client)
-    browser_manager = BrowserManager(config, mqtt_client.client)
-    led_manager = LEDManager(config, mqtt_client.client)
+    sensor_manager = SensorManager(config, mqtt_client.publisher)
+    screen_manager = ScreenManager(config, mqtt_client.publisher, runtime)
+    browser_manager = BrowserManager(config, mqtt_client.publisher, runtime)
+    led_strips = LEDStrips(config)
+    led_managers = [LEDManager(config, mqtt_client.publisher, segment) for segment in led_strips.segments]
+
+    # Dims and blanks the screen when nobody is using it
+    idle_policy = IdlePolicy(config, screen_manager, led_strips.renderer)
+    idle_policy.start()
+
+    # Custom effects pushed as JSON (see effects/dsl.py), shared by every light
+    effect_define_topic = f"{config['mqtt']['base_topic']}/light/effects/define"
+
+    def handle_effect_definition(client, userdata, msg):
+        try:
+            led_strips.define_effect(json.loads(msg.payload.decode()))
+        except Exception as e:
+            print(f"Error defining effect: {e}")
+            return
+        # Re-publish discovery so Home Assistant lists the new effect
+        for led_manager in led_managers:
+            led_manager.discovery = led_manager.build_discovery()
+            led_manager.setup_discovery()
+
+    # Every manager builds its discovery configs once, as they never change at
+    # runtime, and publishes them with force=True: this only runs on connect
+    # or when Home Assistant restarts, i.e. when it needs them again
+    def publish_discovery():
+        sensor_manager.setup_discovery()
+        screen_manager.setup_discovery()
+        browser_manager.setup_discovery()
+        for led_manager in led_managers:
+            led_manager.setup_discovery()
+
+    def publish_led_state():
+        for led_manager in led_managers:
+            led_manager.publish_state()
+
+    def publish_all_state():
+        sensor_manager.publish_state()
+        publish_led_state()
+        screen_manager.check_screen_status_periodically()
+
+    # Home Assistant announces itself here when it (re)starts and has lost
+    # every discovery config and state that wasn't retained
+    birth_topic = config['mqtt'].get('birth_topic', f"{config['mqtt']['base_topic']}/status")
+
+    def handle_birth(client, userdata, msg):
+        if msg.payload.decode().strip() != "online":
+            return
+        print("Home Assistant is online. Re-publishing discovery and state...")
+        mqtt_client.publisher.reset()
+        runtime.submit(publish_discovery)
+        runtime.submit(publish_all_state)
 
     # Define on_connect handler
     def handle_on_connect(client, userdata, flags, rc):
         print("Connected to MQTT broker. Setting up subscriptions and discovery...")
-        sensor_manager.setup_discovery()
-        screen_manager.setup_discovery()
+        runtime.submit(publish_discovery)
         screen_manager.setup_brightness_control()
-        browser_manager.setup_discovery()
         browser_manager.setup_browser_control()
-        led_manager.setup_discovery()
-        led_manager.setup_control()
+        for led_manager in led_managers:
+            led_manager.setup_control()
+        mqtt_client.client.subscribe(birth_topic)
+        mqtt_client.client.message_callback_add(birth_topic, handle_birth)
+        mqtt_client.client.subscribe(effect_define_topic)
+        mqtt_client.client.message_callback_add(effect_define_topic, handle_effect_definition)
+        idle_policy.setup_control(mqtt_client.client)
 
     # Register it with the MQTT client
     mqtt_client.set_on_connect_callback(handle_on_connect)
@@ -95,36 +177,32 @@ def main():
     browser_manager.launch_browser()
 
 
-    # Main loop
+    # Each job runs on its own interval. Discovery is only sent on connect and
+    # when Home Assistant comes online.
+    # The sensor job reschedules itself for whichever sensor is due next
+    runtime.every(SENSOR_INTERVAL, sensor_manager.poll)
+    sensor_manager.watch_network()
+    runtime.every(SCREEN_STATUS_INTERVAL, screen_manager.check_screen_status_periodically, lane="screen")
+    runtime.every(LED_STATE_INTERVAL, publish_led_state)
+    runtime.every(BROWSER_CHECK_INTERVAL, browser_manager.supervise, lane="browser")
+
     try:
-        last_discovery_time = 0
-        while True:
-            now = time.time()
-            if now - last_discovery_time > 60:  # Re-publish every minute
-                print("Re-publishing discovery and state...")
-                sensor_manager.setup_discovery()
-                screen_manager.setup_discovery()
-                browser_manager.setup_discovery()
-                sensor_manager.publish_state()
-                led_manager.publish_state()
-                screen_manager.check_screen_status_periodically()
-                last_discovery_time = now
-
-            sensor_manager.get_all()
-            sensor_manager.publish_state()
-            led_manager.publish_state()
-            screen_manager.check_screen_status_periodically()
-            time.sleep(10)
+        asyncio.run(runtime.run())
     except KeyboardInterrupt:
         print("Exiting...")
     finally:
+        runtime.shutdown()
+        idle_policy.stop()
         browser_manager.close_browser()
 
         ip_address_topic = f"sensor/{config['device']['name'].lower().replace(' ', '_')}/ip_address/state"
         mqtt_client.publish(ip_address_topic, "offline")
 
         mqtt_client.disconnect()
-        led_manager.cleanup()
+        print(f"MQTT messages sent: {mqtt_client.publisher.sent}, suppressed as unchanged: {mqtt_client.publisher.suppressed}")
+        for led_manager in led_managers:
+            led_manager.cleanup()
+        led_strips.cleanup()
 
 if __name__ == "__main__":
     main()
@@ -1,7 +1,49 @@
 import json
+import threading
 import time
 import paho.mqtt.client as mqtt
 
+
+class ChangePublisher:
+    # Stands in for the paho client in the managers. publish() only sends a
+    # payload that differs from the last one sent on that topic, unless it's
+    # forced or the heartbeat interval (seconds) has passed since it was last
+    # sent. Everything else (subscribe, message_callback_add...) goes straight
+    # through to the client.
+    def __init__(self, client, heartbeat=None):
+        self.client = client
+        self.heartbeat = heartbeat
+        self.last = {}  # topic: (payload, time.monotonic() it was sent)
+        self.sent = 0
+        self.suppressed = 0
+        self.lock = threading.Lock()
+
+    def publish(self, topic, payload=None, qos=0, retain=False, force=False):
+        # Returns the paho MQTTMessageInfo, or None when nothing was sent
+        if isinstance(payload, (int, float)):
+            # paho sends numbers as their string form
+            payload = str(payload)
+
+        now = time.monotonic()
+        with self.lock:
+            last = self.last.get(topic)
+            if (not force and last is not None and last[0] == payload and
+                    (not self.heartbeat or now - last[1] < self.heartbeat)):
+                self.suppressed += 1
+                return None
+            self.last[topic] = (payload, now)
+            self.sent += 1
+        return self.client.publish(topic, payload, qos, retain)
+
+    def reset(self):
+        # Forget what was sent, so everything goes out again (e.g. after reconnecting)
+        with self.lock:
+            self.last.clear()
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
 class MQTTClient:
     def __init__(self, config_file):
         with open(config_file, "r") as file:
@@ -26,12 +68,21 @@ class MQTTClient:
         self.client.will_set(lwt_topic, payload="offline", qos=1, retain=True)
         print(f"Set LWT message for {lwt_topic}")
 
+        # Managers publish through this so unchanged state isn't resent
+        self.publisher = ChangePublisher(self.client, mqtt_config.get("heartbeat"))
+
         self.client.on_disconnect = self.on_disconnect
+        self.client.on_connect = self.on_connect
         self.on_connect_callback = None  # Set by external code
 
     def set_on_connect_callback(self, callback):
         self.on_connect_callback = callback
-        self.client.on_connect = callback
+
+    def on_connect(self, client, userdata, flags, rc):
+        # A new session may have lost anything published before, so send it all again
+        self.publisher.reset()
+        if self.on_connect_callback:
+            self.on_connect_callback(client, userdata, flags, rc)
 
     def connect(self):
         try:
@@ -0,0 +1,31 @@
+from array import array
+
+
+class RingBuffer:
+    # Single-producer, single-consumer ring of fixed-width float rows. The
+    # producer fills the next slot and then publishes it by bumping written;
+    # the consumer copies the newest row and retries if the producer lapped it
+    # meanwhile. Neither side takes a lock: each only writes its own fields.
+    def __init__(self, slots, width):
+        self.rows = [array('f', [0.0]) * width for _ in range(slots)]
+        self.stamps = [0.0] * slots
+        self.written = 0
+
+    def push(self, values, stamp):
+        index = self.written % len(self.rows)
+        memoryview(self.rows[index])[:] = values
+        self.stamps[index] = stamp
+        self.written += 1
+
+    def latest(self, out):
+        # Copy the newest row into out and return its timestamp, or None if
+        # nothing has been pushed yet
+        while True:
+            written = self.written
+            if not written:
+                return None
+            index = (written - 1) % len(self.rows)
+            out[:] = self.rows[index]
+            stamp = self.stamps[index]
+            if self.written - written < len(self.rows) - 1:
+                return stamp
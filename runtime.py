@@ -0,0 +1,84 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Runtime:
+    # Runs HomeSlate's periodic jobs as asyncio tasks, each on its own
+    # interval. The jobs themselves are blocking (subprocesses, sysfs, psutil)
+    # so they run in an executor, and a slow one never delays the others.
+    # Work in the same lane runs one at a time, in order; work without a
+    # lane shares a small pool.
+    def __init__(self, workers=4):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="runtime")
+        self.lanes = {}  # lane name: single-thread executor
+        self.jobs = []   # (name, interval, func, lane)
+        self.loop = None
+        self.stop_event = None
+        self.queued = []  # submitted before the loop started
+        self.lock = threading.Lock()
+
+    def executor(self, lane):
+        if lane is None:
+            return self.pool
+        with self.lock:
+            if lane not in self.lanes:
+                self.lanes[lane] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"runtime-{lane}")
+            return self.lanes[lane]
+
+    def every(self, interval, func, name=None, lane=None):
+        # Runs func every interval seconds, or after however many seconds it returns
+        self.jobs.append((name or func.__name__, interval, func, lane))
+
+    def submit(self, func, *args, lane=None):
+        # Run func(*args) in the background; safe to call from any thread,
+        # e.g. MQTT callbacks, so they return straight away
+        with self.lock:
+            if self.loop is None:
+                self.queued.append((func, args, lane))
+                return
+        self.loop.call_soon_threadsafe(self.start_job, func, args, lane)
+
+    def start_job(self, func, args, lane):
+        self.loop.create_task(self.run_job(func.__name__, func, args, lane))
+
+    async def run_job(self, name, func, args, lane):
+        try:
+            return await self.loop.run_in_executor(self.executor(lane), func, *args)
+        except Exception as e:
+            print(f"Error in {name}: {e}")
+
+    async def periodic(self, name, interval, func, lane):
+        while True:
+            started = self.loop.time()
+            delay = await self.run_job(name, func, (), lane)
+            if isinstance(delay, (int, float)) and not isinstance(delay, bool):
+                # The job said when it next needs to run
+                await asyncio.sleep(max(0.0, delay))
+            else:
+                await asyncio.sleep(max(0.0, interval - (self.loop.time() - started)))
+
+    async def run(self):
+        # Until stop() is called (or the task is cancelled, e.g. by Ctrl+C)
+        self.stop_event = asyncio.Event()
+        with self.lock:
+            self.loop = asyncio.get_running_loop()
+            queued, self.queued = self.queued, []
+        for func, args, lane in queued:
+            self.start_job(func, args, lane)
+
+        tasks = [asyncio.create_task(self.periodic(*job)) for job in self.jobs]
+        try:
+            await self.stop_event.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.stop_event.set)
+
+    def shutdown(self):
+        for executor in [self.pool] + list(self.lanes.values()):
+            executor.shutdown(wait=False, cancel_futures=True)
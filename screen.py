@@ -1,16 +1,68 @@
 import json
-import glob
 import subprocess
-import time
+import threading
+from backlight import Backlight
+from display_monitor import DisplayMonitor
+from sysfs_watch import SysfsWatcher
+
+# Seconds between re-reads of the DRM attributes when the driver doesn't notify changes
+DISPLAY_POLL_INTERVAL = 2.0
+# Backlight changes are notified, so re-reading is only a safety net
+BACKLIGHT_POLL_INTERVAL = 30.0
 
 class ScreenManager:
-    def __init__(self, config, mqtt_client):
+    def __init__(self, config, mqtt_client, runtime=None, display_source=None):
         self.config = config
         self.mqtt_client = mqtt_client
+        # Slow work (wlr-randr, fades) goes to the runtime so MQTT callbacks return at once
+        self.runtime = runtime
         self.device_name = self.config['device']['name']
         self.device_id = self.config['device']['id']
         self.display_name = self.config['device']['display_name']
+
+        # Seconds a brightness change takes to fade in
+        self.fade_time = self.config['device'].get('screen_fade_time', 0.6)
+        try:
+            self.backlight = Backlight()
+        except (OSError, ValueError) as e:
+            print(f"Backlight unavailable: {e}")
+            self.backlight = None
+
+        # Fades run on their own worker. A new target cancels the fade in
+        # flight, which then carries on towards the new target from wherever
+        # it had got to.
+        self.fade_target = None
+        self.fade_duration = self.fade_time
+        self.fade_lock = threading.Lock()
+        self.fade_wakeup = threading.Event()
+        self.fade_cancel = threading.Event()
+        self.fade_thread = None
+        self.fading = False
+
+        # Current brightness, resolved and watched once instead of globbing and
+        # reading sysfs on every poll. Changes made outside HomeSlate are
+        # published as they happen.
+        self.brightness = None
+        self.outside_change = False  # brightness changed by something else since our last write
+        self.backlight_watcher = None
+        if self.backlight is not None:
+            try:
+                self.backlight_watcher = SysfsWatcher([self.backlight.actual_path], BACKLIGHT_POLL_INTERVAL)
+                self.backlight_watcher.start(self.handle_backlight_change)
+            except OSError as e:
+                print(f"Backlight watch unavailable: {e}")
+                self.backlight_watcher = None
         
+        # On/off state comes from the DRM connector, cached and published when it
+        # changes; wlr-randr is only polled if the connector can't be found
+        try:
+            self.display_monitor = DisplayMonitor(self.display_name, self.handle_display_change,
+                                                  DISPLAY_POLL_INTERVAL, display_source)
+            self.display_monitor.start()
+        except OSError as e:
+            print(f"Display monitor unavailable, polling wlr-randr: {e}")
+            self.display_monitor = None
+
         # Define control items (screen brightness control)
         self.control_items = [
             {
@@ -20,6 +72,8 @@ class ScreenManager:
             }
         ]
 
+        self.discovery = self.build_discovery()
+
     def control_power(self, power_value):
         # Example screen brightness control logic using the system's backlight path
         try:
@@ -56,79 +110,88 @@ class ScreenManager:
             print(f"The scaled value is {target_brightness}")
 
 
-            # Get the current brightness level
-            current_brightness = self.get_current_screen_brightness()
-            if current_brightness is None:
-                raise ValueError("Failed to get current brightness")
-
-            print(f"Fading brightness from {current_brightness} to {target_brightness}")
-
-            # Define a base delay for the fade
-            delay = 0.05  # 50ms delay (can be tuned)
-
-            # Define a tolerance threshold to prevent overshooting
-            tolerance = 1  # Set to 1 for small steps
-
-            # If the current brightness is already the target, skip the fade
-            if current_brightness == target_brightness:
-                print(f"Brightness is already at the target value ({target_brightness}), no change required.")
-                return
-
-            # Gradually adjust the brightness
-            current = current_brightness
-            while abs(current - target_brightness) > tolerance:
-                # Calculate the step size dynamically
-                diff = abs(target_brightness - current)
-                
-                # For small differences, use smaller steps to avoid overshooting
-                if diff < 5:
-                    step_size = 1  # Small steps when the target is close
-                else:
-                    step_size = max(1, diff // 10)  # Larger steps for bigger differences
-
-                # Adjust the current brightness closer to the target
-                if current < target_brightness:
-                    current = min(current + step_size, target_brightness)
-                else:
-                    current = max(current - step_size, target_brightness)
-
-                # Apply the scaled brightness
-                scaled_brightness = current
-                command = f"echo {scaled_brightness} | sudo tee /sys/class/backlight/*/brightness"
-                subprocess.run(command, shell=True, check=True)
+            if self.backlight is None:
+                raise ValueError("No backlight to control")
 
-                # Delay between steps for smoothness
-                time.sleep(delay)
-
-            # Ensure the target brightness is set exactly at the end
-            scaled_target = target_brightness
-            command = f"echo {scaled_target} | sudo tee /sys/class/backlight/*/brightness"
-            subprocess.run(command, shell=True, check=True)
-
-            # Add a small delay after setting the final value to allow hardware adjustments
-            time.sleep(0.1)
-
-            print(f"Screen brightness smoothly faded to {target_brightness}")
-
-            # Publish the final brightness state back to MQTT
-            self.publish_brightness(self.scale_with_min_threshold(target_brightness))
+            # Returns straight away; the fade worker does the rest
+            self.fade_to(target_brightness)
 
         except Exception as e:
             print(f"Error controlling screen brightness: {e}")
 
+    def fade_to(self, target_brightness, duration=None):
+        # duration defaults to screen_fade_time; 0 sets the brightness at once
+        with self.fade_lock:
+            self.fade_target = target_brightness
+            self.fade_duration = self.fade_time if duration is None else duration
+            if self.fade_thread is None:
+                self.fade_thread = threading.Thread(target=self.fade_worker, daemon=True)
+                self.fade_thread.start()
+        self.fade_cancel.set()
+        self.fade_wakeup.set()
+
+    def fade_worker(self):
+        while True:
+            self.fade_wakeup.wait()
+            self.fade_wakeup.clear()
+            with self.fade_lock:
+                target_brightness = self.fade_target
+                duration = self.fade_duration
+                self.fade_cancel.clear()
+
+            self.fading = True
+            try:
+                # Start from the last value written, i.e. where a cancelled fade
+                # stopped, unless the watcher has seen the brightness change
+                # since then; from the hardware on the first fade
+                current_brightness = self.backlight.value
+                if self.outside_change and self.brightness is not None:
+                    current_brightness = self.brightness
+                elif current_brightness is None:
+                    current_brightness = self.backlight.read()
+                self.outside_change = False
+
+                if current_brightness != target_brightness:
+                    print(f"Fading brightness from {current_brightness} to {target_brightness}")
+                    # Eased, time-based fade written straight to sysfs
+                    reached = self.backlight.fade(current_brightness, target_brightness, duration, self.fade_cancel)
+                    if reached != target_brightness:
+                        continue  # Retargeted part way; the next loop picks up the new target
+                    print(f"Screen brightness smoothly faded to {target_brightness}")
+            except Exception as e:
+                print(f"Error fading screen brightness: {e}")
+                self.fading = False
+                continue
+
+            # Publish the final brightness state back to MQTT, once the fade has settled
+            if not self.fade_wakeup.is_set():
+                self.fading = False
+                self.publish_brightness(self.scale_with_min_threshold(target_brightness))
+
+    def handle_backlight_change(self, values):
+        try:
+            self.brightness = int(values[0])
+        except ValueError:
+            return
+        # Our own fades publish once they settle; anything else is an outside change
+        if not self.fading:
+            self.outside_change = self.brightness != self.backlight.value
+            self.publish_brightness(self.scale_with_min_threshold(self.brightness))
+
 
     def publish_state(self, state_value):
         state_topic = f"{self.config['mqtt']['base_topic']}/light/{self.device_name.lower().replace(' ', '_')}/display/state"
-        self.mqtt_client.publish(state_topic, state_value)
-        print(f"Published state: {state_value} to {state_topic}")
+        if self.mqtt_client.publish(state_topic, state_value) is not None:
+            print(f"Published state: {state_value} to {state_topic}")
 
     def publish_brightness(self, brightness_value):
         state_topic = f"{self.config['mqtt']['base_topic']}/light/{self.device_name.lower().replace(' ', '_')}/display/brightness/state"
-        self.mqtt_client.publish(state_topic, brightness_value)
-        print(f"Published brightness: {brightness_value} to {state_topic}")
+        if self.mqtt_client.publish(state_topic, brightness_value) is not None:
+            print(f"Published brightness: {brightness_value} to {state_topic}")
 
-    def setup_discovery(self):
-        # Announce the control elements (screen brightness) to the MQTT broker
+    def build_discovery(self):
+        # [(discovery topic, JSON payload)] for the control elements (screen brightness)
+        discovery = []
         for control_item in self.control_items:
             discovery_topic = f"{self.config['mqtt']['base_topic']}/{control_item['topic']}/config"
             
@@ -148,9 +211,14 @@ class ScreenManager:
                 }
             }
 
-            # Publish discovery message
-            self.mqtt_client.publish(discovery_topic, json.dumps(discovery_payload))
-            print(f"Published discovery for {control_item['name']}")
+            discovery.append((discovery_topic, json.dumps(discovery_payload)))
+        return discovery
+
+    def setup_discovery(self):
+        # Announce the control elements (screen brightness) to the MQTT broker
+        for discovery_topic, discovery_payload in self.discovery:
+            self.mqtt_client.publish(discovery_topic, discovery_payload, force=True)
+        print(f"Published discovery for {', '.join(item['name'] for item in self.control_items)}")
 
     def setup_brightness_control(self):
         # Subscribe to the topic where brightness control commands are sent
@@ -161,17 +229,32 @@ class ScreenManager:
         self.mqtt_client.subscribe(brightness_topic)
         self.mqtt_client.message_callback_add(brightness_topic, self.handle_brightness_control)
 
+    def run(self, func, *args):
+        # Screen work runs one job at a time in its own lane
+        if self.runtime:
+            self.runtime.submit(func, *args, lane="screen")
+        else:
+            func(*args)
+
     def handle_power_control(self, client, userdata, msg):
         # Parse the received message and adjust screen brightness
         payload = msg.payload.decode()
-        self.control_power(payload)
+        self.run(self.control_power, payload)
 
     def handle_brightness_control(self, client, userdata, msg):
         # Parse the received message and adjust screen brightness
         payload = msg.payload.decode()
+        # Doesn't block: the fade runs on its own worker
         self.control_brightness(payload)
 
+    def handle_display_change(self, state):
+        print(f"Display is now {'ON' if state else 'OFF'}")
+        self.publish_state("ON" if state else "OFF")
+
     def get_current_screen_status(self):
+        if self.display_monitor is not None:
+            return self.display_monitor.state
+
         try:
             # Run wlr-randr to get the current state of all outputs
             result = subprocess.run(["wlr-randr"], capture_output=True, text=True, check=True)
@@ -192,19 +275,21 @@ class ScreenManager:
             return None
 
     def get_current_screen_brightness(self):
-        backlight_paths = glob.glob('/sys/class/backlight/*/brightness')
-        if backlight_paths:
-            screen_path = backlight_paths[0]
+        # Cached from the watcher; read directly only if there's no watcher
+        if self.backlight_watcher is not None:
+            return self.brightness
+        if self.backlight is not None:
             try:
-                with open(screen_path, "r") as f:
-                    return int(f.read().strip())  # Return the current brightness value
+                return self.backlight.read()  # Return the current brightness value
             except IOError as e:
                 print(f"Error reading brightness file: {e}")
         return None
 
     def check_screen_status_periodically(self):
         self.publish_state("ON" if self.get_current_screen_status() == True else "OFF")
-        self.publish_brightness(self.scale_with_min_threshold(self.get_current_screen_brightness()))
+        brightness = self.get_current_screen_brightness()
+        if brightness is not None:
+            self.publish_brightness(self.scale_with_min_threshold(brightness))
 
     @staticmethod
     def scale_value(input_value, input_min=3, input_max=255, output_min=14, output_max=255):
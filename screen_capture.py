@@ -0,0 +1,225 @@
+import math
+import os
+import subprocess
+import threading
+import time
+from array import array
+from ringbuffer import RingBuffer
+
+PROFILE = 128        # colour samples around the screen edge, resampled to each strip
+IDLE_TIMEOUT = 5.0   # stop capturing once no effect has asked for colours for this long
+RETRY_TIME = 5.0     # wait before capturing again after a failure
+
+# Each edge walked clockwise, so a strip run around the screen from the
+# bottom left corner is ["left", "top", "right", "bottom"]
+EDGES = ("left", "top", "right", "bottom")
+
+
+def parse_ppm(data):
+    # Binary (P6) PPM -> (width, height, RGB bytes)
+    fields = []
+    pos = 0
+    while len(fields) < 4:
+        while data[pos:pos + 1].isspace():
+            pos += 1
+        if data[pos:pos + 1] == b"#":
+            pos = data.index(b"\n", pos) + 1
+            continue
+        end = pos
+        while not data[end:end + 1].isspace():
+            end += 1
+        fields.append(data[pos:end])
+        pos = end
+    if fields[0] != b"P6" or int(fields[3]) != 255:
+        raise ValueError("Only 8-bit binary PPM images are supported")
+    width, height = int(fields[1]), int(fields[2])
+    pixels = data[pos + 1:pos + 1 + width * height * 3]
+    if len(pixels) < width * height * 3:
+        raise ValueError("Truncated PPM image")
+    return width, height, pixels
+
+
+class GrimSource:
+    # Grabs the output through wlr-screencopy with grim, which downscales
+    # before encoding so only a few hundred pixels ever reach Python. Each
+    # read is still a new process and a full-resolution screencopy, which is
+    # why the default capture rate is kept low; a persistent screencopy
+    # client would remove that cost.
+    def __init__(self, output, scale):
+        self.command = ["grim", "-o", output, "-s", str(scale), "-t", "ppm", "-"]
+
+    def read(self):
+        result = subprocess.run(self.command, capture_output=True, check=True)
+        return parse_ppm(result.stdout)
+
+
+class FileSource:
+    # A PPM image on disk, re-read whenever it changes; for testing without a display
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+        self.image = None
+
+    def read(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self.mtime:
+            with open(self.path, "rb") as f:
+                self.image = parse_ppm(f.read())
+            self.mtime = mtime
+        return self.image
+
+
+def edge_colors(width, height, pixels, edge, depth):
+    # Average colour of each pixel position along one edge, over the band of
+    # depth pixels nearest to it, in clockwise order
+    colors = []
+    if edge in ("top", "bottom"):
+        rows = range(depth) if edge == "top" else range(height - depth, height)
+        columns = range(width) if edge == "top" else range(width - 1, -1, -1)
+        for x in columns:
+            total = [0, 0, 0]
+            for y in rows:
+                i = (y * width + x) * 3
+                total[0] += pixels[i]
+                total[1] += pixels[i + 1]
+                total[2] += pixels[i + 2]
+            colors.append([c / depth for c in total])
+    else:
+        columns = range(depth) if edge == "left" else range(width - depth, width)
+        rows = range(height - 1, -1, -1) if edge == "left" else range(height)
+        for y in rows:
+            total = [0, 0, 0]
+            for x in columns:
+                i = (y * width + x) * 3
+                total[0] += pixels[i]
+                total[1] += pixels[i + 1]
+                total[2] += pixels[i + 2]
+            colors.append([c / depth for c in total])
+    return colors
+
+
+def check_edges(edges):
+    # At least one edge, and only the names in EDGES
+    unknown = [edge for edge in edges if edge not in EDGES]
+    if unknown or not edges:
+        raise ValueError(f"Ambient edges must be some of {', '.join(EDGES)}, got {edges}")
+    return list(edges)
+
+
+def edge_profile(width, height, pixels, edges, depth, samples=PROFILE):
+    # The chosen edges joined end to end and averaged down to samples colours,
+    # as a flat r, g, b, r, g, b... list. depth is the share of the screen
+    # averaged in from each edge.
+    perimeter = []
+    for edge in edges:
+        across = height if edge in ("top", "bottom") else width
+        perimeter.extend(edge_colors(width, height, pixels, edge, max(1, int(across * depth))))
+
+    profile = []
+    count = len(perimeter)
+    for k in range(samples):
+        lo = k * count // samples
+        hi = max(lo + 1, (k + 1) * count // samples)
+        chunk = perimeter[lo:hi]
+        for c in range(3):
+            profile.append(sum(color[c] for color in chunk) / len(chunk))
+    return profile
+
+
+class ScreenCapture:
+    # Samples the screen on its own thread at a steady, low rate and publishes
+    # the edge profile through a RingBuffer. colors() resamples the newest
+    # profile to a strip and smooths it over time, every render frame.
+    def __init__(self, config):
+        self.input = config.get('input', 'grim')
+        self.output = config.get('output')
+        self.scale = config.get('scale', 0.05)
+        self.fps = config.get('fps', 3)
+        self.edges = check_edges(config.get('edges', list(EDGES)))
+        self.depth = config.get('depth', 0.15)          # share of the screen averaged at each edge
+        self.smoothing = config.get('smoothing', 0.2)   # seconds for colours to settle
+
+        self.ring = RingBuffer(4, PROFILE * 3)
+        self.profile = array('f', [0.0]) * (PROFILE * 3)
+        self.smoothed = {}  # strip length: ([r, g, b] per pixel, time of last update)
+
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.last_read = 0.0
+        self.retry_at = 0.0
+        self.lock = threading.Lock()
+
+    def colors(self, length):
+        # Per-pixel (r, g, b) for a strip of length pixels
+        now = time.monotonic()
+        self.last_read = now
+        if self.thread is None or not self.thread.is_alive():
+            self.start()
+        self.ring.latest(self.profile)
+
+        current, updated = self.smoothed.get(length) or ([[0.0, 0.0, 0.0] for _ in range(length)], now)
+        alpha = 1.0 - math.exp(-(now - updated) / self.smoothing) if self.smoothing > 0 else 1.0
+        profile = self.profile
+        result = []
+        for i, pixel in enumerate(current):
+            k = i * PROFILE // length * 3
+            for c in range(3):
+                pixel[c] += (profile[k + c] - pixel[c]) * alpha
+            result.append((int(pixel[0]), int(pixel[1]), int(pixel[2])))
+        self.smoothed[length] = (current, now)
+        return result
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            if time.monotonic() < self.retry_at or self.stop_event.is_set():
+                return
+            self.thread = threading.Thread(target=self.worker, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+
+    def worker(self):
+        source = GrimSource(self.output, self.scale) if self.input == 'grim' else FileSource(self.input)
+        print(f"Screen capture started from {self.input}")
+        interval = 1 / self.fps
+        while not self.stop_event.is_set() and time.monotonic() - self.last_read < IDLE_TIMEOUT:
+            started = time.monotonic()
+            try:
+                width, height, pixels = source.read()
+            except Exception as e:
+                print(f"Error capturing screen from {self.input}: {e}")
+                self.retry_at = time.monotonic() + RETRY_TIME
+                break
+            self.ring.push(array('f', edge_profile(width, height, pixels, self.edges, self.depth)), started)
+            self.stop_event.wait(max(0.0, interval - (time.monotonic() - started)))
+        print(f"Screen capture stopped from {self.input}")
+
+
+_config = {}
+_capture = None
+
+
+def configure(config):
+    # Settings for the shared capture, from device.ambient in config.json
+    global _config
+    check_edges(config.get('edges', list(EDGES)))
+    _config = config
+
+
+def colors(length):
+    # Smoothed screen edge colours for a strip; capture starts on first use
+    # and stops again once nothing has asked for a while
+    global _capture
+    if _capture is None:
+        _capture = ScreenCapture(_config)
+    return _capture.colors(length)
+
+
+def stop():
+    if _capture is not None:
+        _capture.stop()
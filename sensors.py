@@ -1,6 +1,12 @@
 import json
 import psutil
 import socket
+import threading
+import time
+
+# Address change notifications from the kernel (linux/rtnetlink.h)
+RTMGRP_IPV4_IFADDR = 0x10
+NETLINK_SETTLE_TIME = 1.0  # let a burst of address changes finish before reading
 
 class SensorManager:
     def __init__(self, config, mqtt_client):
@@ -9,28 +15,98 @@ class SensorManager:
         self.device_name = self.config['device']['name']
         self.device_id = self.config['device']['id']
         
-        # Define sensors with their corresponding state functions
+        # Define sensors with their corresponding state functions. Each is read
+        # every "interval" seconds; numeric readings only count as a change once
+        # they move by "threshold" or more from the last published value.
         self.sensors = [
             {
                 "name": "CPU Temperature",
                 "topic": f"sensor/{self.device_name.lower().replace(' ', '_')}/cpu_temperature",
                 "unit_of_measurement": "°C",
                 "device_class": "temperature",
-                "state": self.get_cpu_temperature  # Changed from update_function to state
+                "state": self.get_cpu_temperature,  # Changed from update_function to state
+                "interval": 5,
+                "threshold": 0.5
             },
             {
                 "name": "IP Address",
                 "topic": f"sensor/{self.device_name.lower().replace(' ', '_')}/ip_address",
-                "state": self.get_ip_address  # Changed from update_function to state
+                "state": self.get_ip_address,  # Changed from update_function to state
+                # Rarely changes; also re-read straight away on a netlink address event
+                "interval": 300,
+                "netlink": True
             }
         ]
+        for sensor in self.sensors:
+            sensor["next_poll"] = 0.0
+        self.lock = threading.Lock()
+
+        self.discovery = self.build_discovery()
 
     def get_all(self):
         # Dynamically fetch the sensor values by calling the state function
-        for sensor in self.sensors:
-            sensor["value"] = sensor["state"]()  # Changed from update_function to state
+        with self.lock:
+            for sensor in self.sensors:
+                self.update(sensor)
         return self.sensors
 
+    def update(self, sensor):
+        # Read a sensor, keeping the old value if the change is inside its threshold
+        value = sensor["state"]()  # Changed from update_function to state
+        previous = sensor.get("value")
+        threshold = sensor.get("threshold")
+        if threshold and value is not None and previous is not None and abs(value - previous) < threshold:
+            return False
+        sensor["value"] = value
+        return value != previous
+
+    def poll(self):
+        # Read and publish only the sensors that are due, and return the
+        # seconds until the next one is
+        with self.lock:
+            now = time.monotonic()
+            for sensor in self.sensors:
+                if sensor["next_poll"] <= now:
+                    self.update(sensor)
+                    sensor["next_poll"] = now + sensor["interval"]
+            self.publish_state()
+            return max(0.0, min(sensor["next_poll"] for sensor in self.sensors) - time.monotonic())
+
+    def watch_network(self):
+        # Re-read the netlink sensors whenever an IPv4 address is added or
+        # removed, so the long poll interval doesn't delay real changes
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            sock.bind((0, RTMGRP_IPV4_IFADDR))
+        except (AttributeError, OSError) as e:
+            print(f"Netlink address events unavailable, polling only: {e}")
+            return
+        threading.Thread(target=self.netlink_worker, args=(sock,), daemon=True).start()
+
+    def netlink_worker(self, sock):
+        while True:
+            try:
+                sock.recv(65536)
+                # Addresses usually change in bursts (DHCP renew, interface up)
+                time.sleep(NETLINK_SETTLE_TIME)
+                sock.setblocking(False)
+                try:
+                    while sock.recv(65536):
+                        pass
+                except BlockingIOError:
+                    pass
+                sock.setblocking(True)
+            except OSError as e:
+                print(f"Netlink watch stopped: {e}")
+                return
+
+            with self.lock:
+                for sensor in self.sensors:
+                    if sensor.get("netlink"):
+                        self.update(sensor)
+                        sensor["next_poll"] = time.monotonic() + sensor["interval"]
+                self.publish_state()
+
     def get_cpu_temperature(self):
         try:
             # Fetch CPU temperature using psutil
@@ -67,7 +143,9 @@ class SensorManager:
             return "Unknown"
 
 
-    def setup_discovery(self):
+    def build_discovery(self):
+        # [(discovery topic, JSON payload)] for every sensor
+        discovery = []
         for sensor in self.sensors:
             discovery_topic = f"{self.config['mqtt']['base_topic']}/{sensor['topic']}/config"
             
@@ -92,9 +170,13 @@ class SensorManager:
             if "device_class" in sensor and sensor["device_class"]:
                 discovery_payload["device_class"] = sensor["device_class"]
 
-            # Publish discovery message
-            self.mqtt_client.publish(discovery_topic, json.dumps(discovery_payload))
-            print(f"Published discovery for {sensor['name']}")
+            discovery.append((discovery_topic, json.dumps(discovery_payload)))
+        return discovery
+
+    def setup_discovery(self):
+        for discovery_topic, discovery_payload in self.discovery:
+            self.mqtt_client.publish(discovery_topic, discovery_payload, force=True)
+        print(f"Published discovery for {len(self.discovery)} sensors")
 
 
     def publish_state(self):
@@ -103,5 +185,5 @@ class SensorManager:
             state_payload = sensor.get("value")
             # Publish the current value of each sensor
             if state_payload is not None:
-                self.mqtt_client.publish(state_topic, state_payload)
-                print(f"Published state for {sensor['name']}: {state_payload}")
+                if self.mqtt_client.publish(state_topic, state_payload) is not None:
+                    print(f"Published state for {sensor['name']}: {state_payload}")
@@ -0,0 +1,104 @@
+import struct
+import time
+from array import array
+from collections import deque
+
+# WS281x protocol timing: 24 bits per pixel at the strip frequency, followed by
+# a latch/reset gap before the next frame is accepted
+RESET_TIME = 0.00028
+
+
+class SimulatedStrip:
+    # Drop-in stand-in for rpi_ws281x.PixelStrip with no hardware behind it.
+    # show() records the frame and is paced like the real DMA transfer: it
+    # returns straight away, but waits for the previous transfer to finish first.
+    def __init__(self, num, pin=None, freq_hz=800000, dma=10, invert=False, brightness=255, channel=0,
+                 record=None, max_frames=1000, realtime=True):
+        self.size = num
+        self.pixels = array('I', [0]) * num
+        self.brightness = brightness
+        self.realtime = realtime
+        self.transfer_time = num * 24 / freq_hz + RESET_TIME
+
+        # Recent frames in memory as (time.monotonic(), packed pixel bytes)
+        self.frames = deque(maxlen=max_frames)
+        # Optionally every frame appended to a file as
+        # <double timestamp><uint32 pixel count><pixel count * uint32>
+        self.record_file = open(record, "ab") if record else None
+
+        self.shows = 0
+        self.wait_time = 0.0  # time show() spent waiting on the previous transfer
+        self.busy_until = 0.0
+
+    def begin(self):
+        pass
+
+    def numPixels(self):
+        return self.size
+
+    def setPixelColor(self, n, color):
+        self.pixels[n] = color
+
+    def setPixelColorRGB(self, n, red, green, blue, white=0):
+        self.pixels[n] = (white << 24) | (red << 16) | (green << 8) | blue
+
+    def getPixelColor(self, n):
+        return self.pixels[n]
+
+    def getPixels(self):
+        return self.pixels
+
+    def setBrightness(self, brightness):
+        self.brightness = brightness
+
+    def getBrightness(self):
+        return self.brightness
+
+    def led_address(self):
+        # Where frames are copied to, like the C library's LED array; pixels is
+        # never resized, so the address stays valid
+        return self.pixels.buffer_info()[0]
+
+    def __getitem__(self, pos):
+        return self.pixels[pos]
+
+    def __setitem__(self, pos, value):
+        if isinstance(pos, slice):
+            # Element by element, so the array is never resized or reallocated
+            for index, color in zip(range(*pos.indices(self.size)), value):
+                self.pixels[index] = color
+        else:
+            self.pixels[pos] = value
+
+    def show(self):
+        now = time.monotonic()
+        if self.realtime and now < self.busy_until:
+            time.sleep(self.busy_until - now)
+            self.wait_time += self.busy_until - now
+            now = self.busy_until
+
+        frame = self.pixels.tobytes()
+        self.frames.append((now, frame))
+        if self.record_file:
+            self.record_file.write(struct.pack("<dI", now, self.size) + frame)
+
+        self.busy_until = now + self.transfer_time
+        self.shows += 1
+
+    def _cleanup(self):
+        if self.record_file:
+            self.record_file.close()
+            self.record_file = None
+
+
+def read_recording(path):
+    # Yield (timestamp, array('I') of pixels) for each frame in a recording file
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(12)
+            if len(header) < 12:
+                return
+            timestamp, count = struct.unpack("<dI", header)
+            pixels = array('I')
+            pixels.frombytes(f.read(count * 4))
+            yield timestamp, pixels
@@ -0,0 +1,66 @@
+import os
+import select
+import threading
+
+
+class SysfsAttribute:
+    # A sysfs attribute opened once and re-read in place. Attributes the
+    # kernel signals with sysfs_notify() wake poll() with POLLPRI; reading
+    # from the start again re-arms that.
+    def __init__(self, path):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+
+    def read(self):
+        return os.pread(self.fd, 4096, 0).decode().strip()
+
+    def close(self):
+        os.close(self.fd)
+
+
+class SysfsWatcher:
+    # Watches a set of sysfs attributes on one thread and calls
+    # on_change(values) with all their values whenever any of them changes.
+    # Waits for POLLPRI where the driver sends notifications; attributes that
+    # never notify (or plain files, in tests) are simply re-read every
+    # interval seconds, which costs a few small reads and no subprocesses.
+    def __init__(self, paths, interval=10.0):
+        self.paths = paths
+        self.interval = interval
+        self.attributes = []
+        self.values = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self, on_change):
+        self.attributes = [SysfsAttribute(path) for path in self.paths]
+        self.values = [attribute.read() for attribute in self.attributes]
+        on_change(self.values)
+        self.thread = threading.Thread(target=self.worker, args=(on_change,), daemon=True)
+        self.thread.start()
+
+    def worker(self, on_change):
+        poller = select.poll()
+        for attribute in self.attributes:
+            poller.register(attribute.fd, select.POLLPRI | select.POLLERR)
+
+        while not self.stop_event.is_set():
+            poller.poll(self.interval * 1000)
+            if self.stop_event.is_set():
+                break
+            try:
+                values = [attribute.read() for attribute in self.attributes]
+            except OSError as e:
+                print(f"Error reading {', '.join(self.paths)}: {e}")
+                self.stop_event.wait(self.interval)
+                continue
+            if values != self.values:
+                self.values = values
+                on_change(values)
+
+        for attribute in self.attributes:
+            attribute.close()
+
+    def stop(self):
+        # The worker notices within one interval
+        self.stop_event.set()